@@ -1,4 +1,6 @@
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Iterable, Iterator
+from itertools import chain, islice
+from operator import itemgetter
 import math
 
 from lib import Block
@@ -8,12 +10,37 @@ from lib.Attribute import Attribute
 from lib.Condition import Condition
 from lib.Index import HashIndex
 from lib.Block import Block
+from lib.RecordSerializer import RECORD_LENGTH, RECORD_LENGTH_SIZE
 
 import hashlib
+import logging
 import pickle
 import struct
 import os
 
+logger = logging.getLogger(__name__)
+
+# Number of records iter_table_data yields, and insert_into_table writes, at a time
+TABLE_DATA_BATCH_SIZE = 1024
+
+# Bytes hashed into a hash index key, by data type
+INDEX_KEY_BYTES = {
+    "int": lambda value: int(value).to_bytes(),
+    "float": lambda value: struct.pack("f", float(value)),
+    "char": lambda value: str(value).encode("utf-8"),
+    "varchar": lambda value: str(value).encode("utf-8"),
+}
+
+
+def _index_key(key_bytes: bytes) -> int:
+    """
+    Hash the encoded value of an indexed column into a 32-bit hash index key.
+
+    :param key_bytes: The value encoded by INDEX_KEY_BYTES.
+    :return: The low 32 bits of the SHA-256 digest of key_bytes.
+    """
+    return int.from_bytes(hashlib.sha256(key_bytes).digest()[-4:], "big")
+
 
 class StorageManager:
     """
@@ -62,44 +89,62 @@ class StorageManager:
         :param projection: The name of columns selected to be displayed.
         :return: A list of tuples containing the table records.
         """
+        return list(chain.from_iterable(self.iter_table_data(table_name, condition, projection)))
+
+    def iter_table_data(self, table_name: str, condition: Condition | None = None,
+                        projection=None) -> Iterator[List[Tuple[Any, ...]]]:
+        """
+        Retrieves the records from a specified table in batches of up to TABLE_DATA_BATCH_SIZE,
+        reading and filtering one batch at a time.
+
+        :param condition: Condition
+        :param table_name: The name of the table to fetch data from.
+        :param projection: The name of columns selected to be displayed.
+        :return: An iterator of non-empty lists of tuples containing the table records.
+        """
         if projection is None:
             projection = []
         if table_name not in self.tables:
             raise ValueError(f"Table {table_name} not found.")
 
-        records = self.tables[table_name].read_table()
-        attributes = [col[0] for col in self.get_table_schema(table_name).get_metadata()]
-        types = [col[1] for col in self.get_table_schema(table_name).get_metadata()]
+        table_file_manager = self.tables[table_name]
+        attributes = table_file_manager.attribute_names
 
-        if condition and table_name != "information_schema":
-            temp_rec = []
-            for record in records:
-                context = {}
-                for attr, value in zip(attributes, record):
-                    context[attr] = value
+        if table_name == "information_schema":
+            condition = None
+            projection = []
 
+        project = None
+        if len(projection) > 0:
+            name_to_index = table_file_manager.name_to_index
+            for att in projection:
+                if att not in name_to_index:
+                    raise ValueError(f"The column {att} is not in {table_name}")
+
+            projection_idx = [name_to_index[att] for att in projection]
+            if len(projection_idx) > 1:
+                project = itemgetter(*projection_idx)
+            else:
+                project = lambda record, i=projection_idx[0]: (record[i],)
+
+        records = table_file_manager.iter_records()
+        while True:
+            batch = list(islice(records, TABLE_DATA_BATCH_SIZE))
+            if not batch:
+                return
+
+            if condition:
                 try:
-                    if condition.evaluate(context):
-                        temp_rec.append(record)
+                    mask = condition.evaluate_batch(batch, attributes)
                 except ValueError as e:
                     raise ValueError(f"Error evaluating condition: {e}")
+                batch = [record for record, matched in zip(batch, mask) if matched]
 
-            records = temp_rec
-
-        if len(projection) > 0 and table_name != "information_schema":
-            for att in projection:
-                if att not in attributes:
-                    raise ValueError(f"The column {att} is not in {table_name}")
+            if project is not None:
+                batch = list(map(project, batch))
 
-            filtered_records = []
-            for record in records:
-                record_holder = []
-                for att in projection:
-                    record_holder.append(record[attributes.index(att)])
-                filtered_records.append(tuple(record_holder))
-            records = filtered_records
-
-        return records
+            if batch:
+                yield batch
     
     def get_joined_table(self, table_names: List[str], join_attributes: List[Tuple[str, str]], table_conditions: List[Condition], global_condition: Condition | None, projection: List[str] = None):
         """
@@ -195,19 +240,30 @@ class StorageManager:
 
         return (result_records, projection if projection else result_attr)
 
-    def insert_into_table(self, table_name: str, values: List[Tuple[Any, ...]]) -> int:
+    def insert_into_table(self, table_name: str, values: Iterable[Tuple[Any, ...]]) -> int:
         """
         Insert tuples of data into the specified table.
+        The tuples are consumed and written TABLE_DATA_BATCH_SIZE at a time, so values may be a generator.
 
         :param table_name: Name of the table to insert to.
         :param values: Tuples of data to be inserted.
+        :return: The number of tuples inserted.
         """
         if table_name not in self.tables:
             raise ValueError(f"{table_name} not in database")
-        self.tables[table_name].write_table(values)
+
+        table_file_manager = self.tables[table_name]
+        values = iter(values)
+        inserted = 0
+        while True:
+            batch = list(islice(values, TABLE_DATA_BATCH_SIZE))
+            if not batch:
+                break
+            table_file_manager.write_table(batch)
+            inserted += len(batch)
 
         self.update_index(table_name)
-        return len(values)
+        return inserted
 
     def delete_table(self, table_name: str) -> None:
         """
@@ -226,7 +282,7 @@ class StorageManager:
         )
 
         # delete table file manager
-        self.tables.pop(table_name)
+        self.tables.pop(table_name).close()
 
         # remove table from storage
         table_file = f"{self.base_path}/{table_name}_table.bin"
@@ -356,8 +412,14 @@ class StorageManager:
         if attr_count == -1:
             raise Exception("There is no such column!")
 
+        if dtype not in INDEX_KEY_BYTES:
+            raise ValueError("Unsupported Data Type")
+        encode_key = INDEX_KEY_BYTES[dtype]
+
         self.index = HashIndex()
-        tfm = TableFileManager(table_name, schema)
+        tfm = self.tables[table_name]
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        unpack_length = RECORD_LENGTH.unpack_from
         # records: List[Tuple[Any, ...]] = []
         current_block = 0
 
@@ -366,54 +428,22 @@ class StorageManager:
             offset = 0
 
             if current_block == 0:
-                header_length = int.from_bytes(block.data[4:8], byteorder="little")
-                offset = header_length
+                offset = tfm.header_length
 
-            while offset < block.header["free_space_offset"]:
-                record_bytes = bytearray()
+            free_space_offset = block.header["free_space_offset"]
+            view = memoryview(block.data)
 
+            while offset < free_space_offset:
                 offset_note = offset
-                while block.data[offset] != 0xCC:
-                    record_bytes.append(block.data[offset])
-                    offset += 1
-
-                record_bytes.append(block.data[offset])
-                offset += 1
+                offset += RECORD_LENGTH_SIZE + unpack_length(view, offset)[0]
 
-                record = tfm.serializer.deserialize(record_bytes)
+                record = tfm.serializer.deserialize(view[offset_note:offset])
                 # records.append(record)
 
-                print("isi record : ")
-                print(record)
+                if debug_enabled:
+                    logger.debug("isi record : %s", record)
                 # record = tfm.serializer.serialize(record)
-                if dtype == "int":
-                    key = int(
-                        hashlib.sha256(int(record[attr_count]).to_bytes()).hexdigest(),
-                        16,
-                    ) % (2 ** 32)
-                elif dtype == "float":
-                    key = int(
-                        hashlib.sha256(
-                            struct.pack("f", float(record[attr_count]))
-                        ).hexdigest(),
-                        16,
-                    ) % (2 ** 32)
-                elif dtype == "char":
-                    key = int(
-                        hashlib.sha256(
-                            str(record[attr_count]).encode("utf-8")
-                        ).hexdigest(),
-                        16,
-                    ) % (2 ** 32)
-                elif dtype == "varchar":
-                    key = int(
-                        hashlib.sha256(
-                            str(record[attr_count]).encode("utf-8")
-                        ).hexdigest(),
-                        16,
-                    ) % (2 ** 32)
-                else:
-                    raise ValueError("Unsupported Data Type")
+                key = _index_key(encode_key(record[attr_count]))
 
                 # key = int(hashlib.sha256(record[attr_count]).hexdigest(), 16) % (2**32)
                 self.index.add(key, (current_block, offset_note))
@@ -427,7 +457,7 @@ class StorageManager:
             pickle.dump(self.index, file)
 
     def get_index(self, table_name: str, column: str, value: str | int | float, dtype: str):
-        print("masuk getIndex")
+        logger.debug("masuk getIndex")
         file_path = os.path.join("./storage", f"{table_name}-{column}-hash.pickle")
         if not (os.path.isfile(file_path)):
             return None
@@ -435,19 +465,12 @@ class StorageManager:
         with open(file_path, "rb") as file:  # Open in binary read mode
             self.index = pickle.load(file)
 
-        if dtype == "int":
-            key = int(hashlib.sha256(int(value).to_bytes()).hexdigest(), 16) % (2 ** 32)
-        elif dtype == "float":
-            key = int(hashlib.sha256(struct.pack('f', float(value))).hexdigest(), 16) % (2 ** 32)
-        elif dtype == "char":
-            key = int(hashlib.sha256(str(value).encode('utf-8')).hexdigest(), 16) % (2 ** 32)
-        elif dtype == "varchar":
-            key = int(hashlib.sha256(str(value).encode('utf-8')).hexdigest(), 16) % (2 ** 32)
-        else:
+        if dtype not in INDEX_KEY_BYTES:
             raise ValueError("Unsupported Data Type")
+        key = _index_key(INDEX_KEY_BYTES[dtype](value))
 
         index_result = self.index.find(key)
-        print("index_result : ", index_result)
+        logger.debug("index_result : %s", index_result)
 
         schema = self.get_table_schema(table_name)
         metadata = schema.get_metadata()
@@ -456,7 +479,8 @@ class StorageManager:
             if metadata[i][0] == column:
                 attr_count = i
 
-        tfm = TableFileManager(table_name, schema)
+        tfm = self.tables[table_name]
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
 
         result = []
         for i in range(len(index_result)):
@@ -464,22 +488,32 @@ class StorageManager:
             offset = index_result[i][1]
             block = Block.read_block(tfm.file_path, current_block)
 
-            record_bytes = bytearray()
-
-            while block.data[offset] != 0xCC:
-                record_bytes.append(block.data[offset])
-                offset += 1
-
-            record_bytes.append(block.data[offset])
+            length = RECORD_LENGTH.unpack_from(block.data, offset)[0]
+            record_bytes = memoryview(block.data)[offset:offset + RECORD_LENGTH_SIZE + length]
 
             record = tfm.serializer.deserialize(record_bytes)
 
             if record[attr_count] == value:
                 result.append(record)
-            print("record : ", record)
+            if debug_enabled:
+                logger.debug("record : %s", record)
 
         return result
 
+    def close(self) -> None:
+        """
+        Release the open files of every table, including the information_schema.
+        Tables reopen their files when they are used again.
+        """
+        for table_file_manager in self.tables.values():
+            table_file_manager.close()
+
+    def __enter__(self) -> "StorageManager":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
     # ===== Private Methods ===== #
 
     def __initialize_information_schema(self) -> None:
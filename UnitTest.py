@@ -4,10 +4,17 @@ import shutil
 import json
 import uuid
 import sys
+import io
+import struct
+from contextlib import redirect_stdout
 from lib.Schema import Schema
 from lib.Attribute import Attribute
 from lib.Condition import Condition
+from lib.Block import Block
+from lib.RecordSerializer import RecordSerializer
+from lib.Expression import ExpressionParser
 from StorageManager import StorageManager
+from test_driver import TestDriver
 
 
 class TestStorageManager(unittest.TestCase):
@@ -43,6 +50,12 @@ class TestStorageManager(unittest.TestCase):
         # Reinitialize the StorageManager after cleanup
         self.storage_manager = StorageManager(self.TEST_BASE_PATH)
 
+    def tearDown(self):
+        """
+        Close the files opened by the StorageManager.
+        """
+        self.storage_manager.close()
+
     def generate_unique_table_name(self, base_name="test_table"):
         """
         Generate a unique table name for each test case.
@@ -99,6 +112,68 @@ class TestStorageManager(unittest.TestCase):
         modified_data = list(map(lambda x : (x[0], "'" + x[1] + "'"), data))
         self.assertEqual(modified_data, retrieved_data)
 
+    def test_separate_base_paths(self):
+        """
+        Test that tables with the same name under different base paths do not share buffered blocks.
+        """
+        other_base_path = os.path.join(self.TEST_BASE_PATH, "other")
+        os.makedirs(other_base_path, exist_ok=True)
+
+        table_name = self.generate_unique_table_name("test_table")
+        schema = Schema([Attribute("id", "int", 4), Attribute("name", "varchar", 50)])
+        self.storage_manager.create_table(table_name, schema)
+        self.storage_manager.insert_into_table(table_name, [(1, "Alice")])
+
+        with StorageManager(other_base_path) as other_storage_manager:
+            other_storage_manager.create_table(table_name, schema)
+            other_storage_manager.insert_into_table(table_name, [(2, "Bob"), (3, "Cici")])
+
+            self.assertEqual(self.storage_manager.get_table_data(table_name), [(1, "'Alice'")])
+            self.assertEqual(other_storage_manager.get_table_data(table_name), [(2, "'Bob'"), (3, "'Cici'")])
+
+    def write_legacy_table(self, file_path, schema, records):
+        """
+        Write a table file in the HEAD format, where every record ends with a 0xCC sentinel.
+        """
+        schema_bytes = schema.serialize()
+        header = b"HEAD" + struct.pack("<IIHHH", 19 + len(schema_bytes), len(records), 1, len(schema_bytes), len(schema.attributes)) + schema_bytes + b"\xCC"
+        block = Block()
+        block.add_record(header)
+        for record in records:
+            record_bytes = bytearray(b"RC")
+            for value, attribute in zip(record, schema.attributes):
+                if attribute.dtype == "int":
+                    record_bytes += struct.pack("<i", value)
+                elif attribute.dtype == "float":
+                    record_bytes += struct.pack("<f", value)
+                else:
+                    record_bytes += struct.pack("<H", len(value)) + value.encode("utf-8")
+            block.add_record(record_bytes + b"\xCC")
+        with open(file_path, "wb") as file:
+            file.write(block.to_bytes())
+
+    def test_migrate_legacy_table(self):
+        """
+        Test opening tables stored in the HEAD format, with 0xCC bytes inside the record fields.
+        """
+        legacy_base_path = os.path.join(self.TEST_BASE_PATH, self.generate_unique_table_name("legacy"))
+        os.makedirs(legacy_base_path)
+
+        table_name = self.generate_unique_table_name("test_table")
+        schema = Schema([Attribute("id", "int", 4), Attribute("score", "float", 4), Attribute("name", "varchar", 50)])
+        records = [(204, 1.5, "Alice"), (0xCCCC, -2.0, "Bob")]
+        self.write_legacy_table(os.path.join(legacy_base_path, "information_schema_table.bin"),
+                                Schema([Attribute("table_name", "varchar", 50)]), [(table_name,)])
+        self.write_legacy_table(os.path.join(legacy_base_path, f"{table_name}_table.bin"), schema, records)
+
+        expected = [(204, 1.5, "'Alice'"), (0xCCCC, -2.0, "'Bob'")]
+        with StorageManager(legacy_base_path) as storage_manager:
+            self.assertEqual(storage_manager.get_table_data(table_name), expected)
+            storage_manager.insert_into_table(table_name, [(3, 0.5, "Cici")])
+
+        with StorageManager(legacy_base_path) as storage_manager:
+            self.assertEqual(storage_manager.get_table_data(table_name), expected + [(3, 0.5, "'Cici'")])
+
     def test_get_table_schema(self):
         """
         Test retrieving the schema of a table.
@@ -226,6 +301,25 @@ class TestStorageManager(unittest.TestCase):
         # check records
         self.assertEqual(self.storage_manager.get_table_data(table_name), [(5, "'Eko'", 19)])
 
+    def test_delete_records_truncate(self):
+        """
+        Test that blocks dropped from the table file are dropped from the buffer too.
+        """
+        table_name = self.generate_unique_table_name("test_table")
+        schema = Schema([Attribute("id", "int", 4), Attribute("name", "varchar", 50)])
+        self.storage_manager.create_table(table_name, schema)
+        self.storage_manager.insert_into_table(table_name, [(i, "x" * 50) for i in range(300)])
+
+        table_file_manager = self.storage_manager.tables[table_name]
+        block_count = table_file_manager.block_count
+        self.storage_manager.delete_table_record(table_name, Condition("id", ">", "0"))
+        self.assertEqual(table_file_manager.block_count, 1)
+        for block_number in range(1, block_count):
+            self.assertIsNone(table_file_manager.get_buffer(table_file_manager.file_path, block_number))
+
+        self.storage_manager.insert_into_table(table_name, [(i, "y") for i in range(1, 300)])
+        self.assertEqual(self.storage_manager.get_table_data(table_name), [(0, "'" + "x" * 50 + "'")] + [(i, "'y'") for i in range(1, 300)])
+
     def test_update_records(self):
         """
         Test if table can update records using conditions.
@@ -250,6 +344,40 @@ class TestStorageManager(unittest.TestCase):
         self.storage_manager.update_table(table_name, {"age" : "age ^ (5 - 3) - 100"} , Condition("id", "=", "4"))
         self.assertEqual(self.storage_manager.get_table_data(table_name), [(1, "'Agus'", 20), (2, "'Bagas'", 21), (3, "'Ciko'", 21), (4, "'Dito'", 341), (5, "'Eko'", 19)])
 
+    def test_update_records_resized(self):
+        """
+        Test if table can update records whose serialized size changes.
+        """
+        table_name = self.generate_unique_table_name("test_table")
+        schema = Schema([Attribute("id", "int", 4), Attribute("name", "varchar", 50), Attribute("age", "int", 4)])
+        self.storage_manager.create_table(table_name, schema)
+
+        # insert records
+        self.storage_manager.insert_into_table(table_name, [(1, "Agus", 20), (2, "Bagas", 21), (3, "Ciko", 21)])
+
+        # update records with a longer and a shorter name
+        self.assertEqual(self.storage_manager.update_table(table_name, {"name" : "'Agustinus'"} , Condition("id", "=", "1")), 1)
+        self.assertEqual(self.storage_manager.update_table(table_name, {"name" : "'Bo'"} , Condition("id", "=", "2")), 1)
+        self.assertEqual(self.storage_manager.get_table_data(table_name), [(1, "'Agustinus'", 20), (2, "'Bo'", 21), (3, "'Ciko'", 21)])
+
+    def test_update_records_failed(self):
+        """
+        Test that an update failing on a later record leaves every record unchanged.
+        """
+        table_name = self.generate_unique_table_name("test_table")
+        schema = Schema([Attribute("id", "int", 4), Attribute("a", "int", 4)])
+        self.storage_manager.create_table(table_name, schema)
+        self.storage_manager.insert_into_table(table_name, [(1, 2), (2, 0), (3, 7)])
+
+        with self.assertRaises(ValueError):
+            self.storage_manager.update_table(table_name, {"id": "id + 100", "a": "10 / a"})
+        self.assertEqual(self.storage_manager.get_table_data(table_name), [(1, 2), (2, 0), (3, 7)])
+
+        # an int past the 4-byte range on the last record
+        with self.assertRaises(ValueError):
+            self.storage_manager.update_table(table_name, {"a": "a * 1000000000"})
+        self.assertEqual(self.storage_manager.get_table_data(table_name), [(1, 2), (2, 0), (3, 7)])
+
     def test_set_and_get_index(self):
         """
         Test creating a hash index on a table column and retrieving records using the index.
@@ -272,6 +400,161 @@ class TestStorageManager(unittest.TestCase):
         expected = [(1,"'Alice'"), (3, "'Alice'")]
         self.assertEqual(result, expected, "get_index did not return the expected records.")
 
+class TestCompiledConditions(unittest.TestCase):
+    METADATA = [("id", "int", 4), ("score", "float", 4), ("name", "varchar", 20)]
+    RECORDS = [(1, 0.5, "Alice"), (2, 2.25, "Bob"), (3, -1.5, "Cici"), (0, 0.1, "")]
+
+    def setUp(self):
+        """
+        Serialize the records once with and without the varchar column.
+        """
+        self.attributes = [name for name, _, _ in self.METADATA]
+        self.serializer = RecordSerializer(self.METADATA)
+        self.fixed_serializer = RecordSerializer(self.METADATA[:2])
+
+    def serialize(self, serializer, records):
+        """
+        Serialize records back to back, returning the buffer and the (start, end) offset of every record.
+        """
+        buffer = bytearray()
+        spans = []
+        for record in records:
+            start = len(buffer)
+            buffer += serializer.serialize(record)
+            spans.append((start, len(buffer)))
+        return buffer, spans
+
+    def expected(self, serializer, condition, buffer, spans):
+        """
+        Evaluate condition on every deserialized record.
+        """
+        attributes = [name for name, _, _ in serializer.schema]
+        return [condition.evaluate(dict(zip(attributes, serializer.deserialize(buffer[start:end]))))
+                for start, end in spans]
+
+    def test_compile(self):
+        """
+        Test that compiled conditions give the same results as evaluate, on int, float and varchar columns.
+        """
+        buffer, spans = self.serialize(self.serializer, self.RECORDS)
+        conditions = [
+            Condition("id", ">", "1"), Condition("1", "<", "id"), Condition("2", "!=", "id"),
+            Condition("score", ">=", "0.5"), Condition("0.1", ">=", "score"), Condition("score", "=", "2.25"),
+            Condition("name", "=", "'Bob'"), Condition("'Bob'", "<", "name"), Condition("name", "<=", "''"),
+        ]
+        for condition in conditions:
+            predicate = condition.compile(self.serializer.fixed_offsets())
+            self.assertIsNotNone(predicate, condition.__dict__)
+            self.assertEqual([predicate(buffer, start) for start, _ in spans],
+                             self.expected(self.serializer, condition, buffer, spans), condition.__dict__)
+
+        for condition in [Condition("id + 1", "<", "3"), Condition("id", "<", "score"),
+                          Condition("score", ">", "-1"), Condition("name", "=", "1"), Condition("id", "=", "'1'")]:
+            self.assertIsNone(condition.compile(self.serializer.fixed_offsets()), condition.__dict__)
+
+    def test_compile_batch(self):
+        """
+        Test that batch-compiled conditions give the same results as evaluate on fixed-size records.
+        """
+        buffer, spans = self.serialize(self.fixed_serializer, [record[:2] for record in self.RECORDS])
+        offsets, record_size = self.fixed_serializer.fixed_offsets(), self.fixed_serializer.fixed_size()
+        conditions = [
+            Condition("id", "<=", "2"), Condition("2", "<=", "id"), Condition("id", "=", "0"),
+            Condition("score", "<", "0.5"), Condition("0.1", "=", "score"), Condition("2.25", ">", "score"),
+        ]
+        for condition in conditions:
+            predicate = condition.compile_batch(offsets, record_size)
+            self.assertIsNotNone(predicate, condition.__dict__)
+            self.assertEqual(predicate(buffer, 0, len(buffer)),
+                             self.expected(self.fixed_serializer, condition, buffer, spans), condition.__dict__)
+
+        for condition in [Condition("id * 2", ">", "1"), Condition("id", "<", "score"), Condition("score", ">", "-1")]:
+            self.assertIsNone(condition.compile_batch(offsets, record_size), condition.__dict__)
+        self.assertIsNone(Condition("name", "=", "'Bob'").compile_batch(self.serializer.fixed_offsets(), 40))
+
+    def test_compile_expression(self):
+        """
+        Test that compiled expressions give the same results as evaluate.
+        """
+        parser = ExpressionParser()
+        expressions = ["id + 1", "score * 2 - id", "(id + 2) / 4", "id ^ 2", "7", "'Mr ' + name", "name"]
+        for record in [(1, 0.5, "'Alice'"), (3, -1.5, "'Cici'")]:
+            context = dict(zip(self.attributes, record))
+            for expression in expressions:
+                self.assertEqual(parser.compile(expression, self.attributes)(record),
+                                 parser.evaluate(expression, context), expression)
+
+
+class TestKWLDriver(unittest.TestCase):
+    TEST_BASE_PATH = "test_storage_driver"
+
+    def setUp(self):
+        """
+        Set up a TestDriver on an empty base directory before each test.
+        """
+        os.makedirs(self.TEST_BASE_PATH)
+        self.driver = TestDriver(self.TEST_BASE_PATH)
+
+    def tearDown(self):
+        """
+        Close the files opened by the TestDriver and remove its base directory.
+        """
+        self.driver.storage_manager.close()
+        shutil.rmtree(self.TEST_BASE_PATH)
+
+    def run_statements(self, *statements):
+        """
+        Run statements through the driver as a piped script and return the printed lines.
+        """
+        output = io.StringIO()
+        stdin = sys.stdin
+        sys.stdin = io.StringIO("\n".join(statements) + "\n")
+        try:
+            with redirect_stdout(output):
+                self.driver.run()
+        finally:
+            sys.stdin = stdin
+        return output.getvalue().splitlines()
+
+    def test_insert_rows(self):
+        """
+        Test inserting several rows at once, with quoted commas and parentheses and typed literals.
+        """
+        output = self.run_statements(
+            "CREATE TABLE p (id int, score float, name varchar(20))",
+            "INSERT INTO p VALUES (1, 1e5, 'a, b'), (-2, .5, \"(c)\"), (3, -1.25, 'd)')",
+        )
+        self.assertEqual(output[-1], "Data inserted into 'p' successfully.")
+        self.assertEqual(
+            self.driver.storage_manager.get_table_data("p"),
+            [(1, 100000.0, "'a, b'"), (-2, 0.5, "'(c)'"), (3, -1.25, "'d)'")],
+        )
+
+    def test_unsupported_statements(self):
+        """
+        Test that statements only sharing their first word with a supported statement are rejected.
+        """
+        output = self.run_statements("create foo", "insert foo", "delete foo", "drop foo", "foo")
+        self.assertEqual(output, ["Error: Unsupported KWL statement."] * 5)
+
+    def test_update_expression_with_string_literal(self):
+        """
+        Test that an assignment keeps its whole expression, including quoted commas.
+        """
+        self.run_statements(
+            "CREATE TABLE p (id int, name varchar(20), age int)",
+            "INSERT INTO p VALUES (1, 'Agus', 20)",
+            "INSERT INTO p VALUES (2, 'Bagas', 21)",
+            "UPDATE p SET name = 'Mr ' + name WHERE id = 1",
+            "UPDATE p SET name = 'B, C', age = age + 1 WHERE id = 2",
+        )
+        self.assertEqual(self.driver.storage_manager.get_table_data("p"), [(1, "'Mr Agus'", 20), (2, "'B, C'", 22)])
+
+        output = self.run_statements("UPDATE p SET name = 'x', , age = 2 WHERE id = 1")
+        self.assertEqual(output, ["Error: Invalid assignment 'name = 'x', , age = 2'"])
+        self.assertEqual(self.driver.storage_manager.get_table_data("p"), [(1, "'Mr Agus'", 20), (2, "'B, C'", 22)])
+
+
 class ColoredTextTestResult(unittest.TextTestResult):
     GREEN = "\033[92m"
     RED = "\033[91m"
@@ -1,3 +1,17 @@
+import sys
+
+# Supported data types
+DTYPES = frozenset({"int", "float", "char", "varchar"})
+
+# Largest serialized size of a field, by data type, given the attribute size
+MAX_FIELD_SIZE = {
+    "int": lambda size: 4,
+    "float": lambda size: 4,
+    "char": lambda size: size,
+    "varchar": lambda size: 2 + size,
+}
+
+
 class Attribute:
     """
     Represents a single column in the table schema.
@@ -12,11 +26,11 @@ class Attribute:
         :param size: The size of the column (in bytes).
         """
 
-        if dtype not in ["int", "float", "char", "varchar"]:
+        if dtype not in DTYPES:
             raise ValueError("Unsupported Data Type")
 
         self.name: str = name
-        self.dtype: str = dtype
+        self.dtype: str = sys.intern(dtype)
         self.size: int = size
 
         if dtype == "int" or dtype == "float":
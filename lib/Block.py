@@ -1,8 +1,9 @@
-from typing import ByteString
+from typing import BinaryIO, ByteString, List
 
 # Constants for block sizes
 BLOCK_SIZE = 4096  # 4KB
-DATA_SIZE = BLOCK_SIZE - 12  # Data size excluding the header (12 bytes)
+BLOCK_HEADER_SIZE = 12  # page_id, record_count, free_space_offset
+DATA_SIZE = BLOCK_SIZE - BLOCK_HEADER_SIZE  # Data size excluding the header (12 bytes)
 
 
 class Block:
@@ -24,6 +25,8 @@ class Block:
         }
         self.data: bytearray = bytearray(DATA_SIZE)
         self.cursor: int = 0
+        # Set while the block holds changes not yet written to the table file, so the buffer can tell pending blocks apart
+        self.dirty: bool = False
         self.reset_header()
 
     def reset_header(self) -> None:
@@ -50,6 +53,23 @@ class Block:
         self.header["free_space_offset"] += record_size
         self.header["record_count"] += 1
 
+    def add_records(self, records_bytes: ByteString, record_count: int) -> None:
+        """
+        Add a run of consecutive serialized records to the block with a single copy.
+
+        :param records_bytes: The serialized records, back to back.
+        :param record_count: The number of records in records_bytes.
+        :raises ValueError: If there is not enough free space in the block.
+        """
+        size = len(records_bytes)
+        if self.header["free_space_offset"] + size > DATA_SIZE:
+            raise ValueError("Page is full, cannot add record.")
+
+        start = self.header["free_space_offset"]
+        self.data[start:start + size] = records_bytes
+        self.header["free_space_offset"] += size
+        self.header["record_count"] += record_count
+
     def to_bytes(self) -> bytearray:
         """
         Serialize the block (header + data) into bytes.
@@ -71,7 +91,7 @@ class Block:
         self.header["page_id"] = int.from_bytes(data[:4], 'little')
         self.header["record_count"] = int.from_bytes(data[4:8], 'little')
         self.header["free_space_offset"] = int.from_bytes(data[8:12], 'little')
-        self.data[:] = data[12:]
+        self.data[:] = data[BLOCK_HEADER_SIZE:]
 
     def capacity(self) -> int:
         """
@@ -96,6 +116,25 @@ class Block:
             block.from_bytes(fd.read(BLOCK_SIZE))
             return block
 
+    @staticmethod
+    def read_blocks_from(source: ByteString, start: int, count: int) -> List["Block"]:
+        """
+        Read a run of consecutive blocks from the contents of a table file,
+        such as a memory-mapped file.
+
+        :param source: The contents of the binary file.
+        :param start: The first block number (zero-indexed) to read.
+        :param count: The number of consecutive blocks to read.
+        :return: The deserialized Block objects, in block order.
+        """
+        blocks = []
+        with memoryview(source) as view:
+            for block_num in range(start, start + count):
+                block = Block()
+                block.from_bytes(view[block_num * BLOCK_SIZE:(block_num + 1) * BLOCK_SIZE])
+                blocks.append(block)
+        return blocks
+
     def write_block(self, file_path: str, block_num: int) -> None:
         """
         Write the block to a file.
@@ -107,6 +146,18 @@ class Block:
             fd.seek(block_num * BLOCK_SIZE)
             fd.write(self.to_bytes())
 
+    @staticmethod
+    def write_blocks_to(fd: BinaryIO, start: int, blocks: List["Block"]) -> None:
+        """
+        Write a run of consecutive blocks to an open file with a single write call.
+
+        :param fd: The binary file, opened for writing.
+        :param start: The block number (zero-indexed) of the first block.
+        :param blocks: The blocks to write, in block order.
+        """
+        fd.seek(start * BLOCK_SIZE)
+        fd.write(b"".join(block.to_bytes() for block in blocks))
+
     def init_cursor(self) -> None:
         """
         Initialize the cursor for sequential reading of the block's data.
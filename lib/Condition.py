@@ -1,5 +1,18 @@
-from typing import Any, Dict, Union
+import re
+import struct
+from operator import eq, ge, gt, le, lt, ne
+from typing import Any, ByteString, Callable, Dict, List, Tuple, Union
 from lib.Expression import ExpressionParser  # Assuming the previous implementation is in this file
+from lib.RecordSerializer import FIELD_FORMATS, VARCHAR_LENGTH
+
+# ExpressionParser holds no per-expression state, so every Condition shares one
+_PARSER = ExpressionParser()
+
+_COMPARATORS = {"<": lt, ">": gt, "=": eq, "<=": le, ">=": ge, "!=": ne}
+_MIRRORED = {"<": ">", ">": "<", "=": "=", "<=": ">=", ">=": "<=", "!=": "!="}
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+_STRING_RE = re.compile(r"'[^']*'")
+
 
 class Condition:
     """
@@ -18,7 +31,7 @@ class Condition:
         :param operator: The comparison operator
         :param operand2: The second operand (column or expression)
         """
-        self.expression_parser = ExpressionParser()
+        self.expression_parser = _PARSER
 
         self.operand1: str = operand1
         self.operator: str = operator
@@ -67,4 +80,98 @@ class Condition:
         elif self.operator == "!=":
             return value1 != value2
         else:
-            raise ValueError("Invalid operator")
\ No newline at end of file
+            raise ValueError("Invalid operator")
+
+    def evaluate_batch(self, records: List[Tuple[Any, ...]], attributes: List[str]) -> List[bool]:
+        """
+        Evaluate the condition against a batch of records.
+        Both operands are tokenized once for the whole batch instead of once per record.
+
+        :param records: Records to test, with values ordered like attributes
+        :param attributes: Attribute names of the record positions
+        :return: Boolean result of the condition for each record
+        """
+        parser = self.expression_parser
+        tokens1 = parser.tokenize(self.operand1)
+        tokens2 = parser.tokenize(self.operand2)
+        compare = _COMPARATORS[self.operator]
+
+        mask = []
+        for record in records:
+            context = dict(zip(attributes, record))
+            try:
+                value1 = parser.evaluate_tokens(tokens1, context)
+                value2 = parser.evaluate_tokens(tokens2, context)
+            except Exception as e:
+                raise ValueError(f"Error evaluating expression: {e}")
+            mask.append(compare(value1, value2))
+
+        return mask
+
+    def compile(self, field_offsets: Dict[str, Tuple[int, str]]) -> Callable[[ByteString, int], bool] | None:
+        """
+        Compile the condition into a predicate that reads serialized records directly.
+        Only conditions comparing one int or float column to a number literal, or one
+        varchar column to a string literal, are supported.
+
+        :param field_offsets: Field name -> (offset inside a record, data type), see RecordSerializer.fixed_offsets
+        :return: A predicate taking (buffer, record start offset), or None if the condition is not supported
+        """
+        operand1, operator, operand2 = self.operand1.strip(), self.operator, self.operand2.strip()
+        if operand1 not in field_offsets:
+            operand1, operator, operand2 = operand2, _MIRRORED[operator], operand1
+
+        if operand1 not in field_offsets:
+            return None
+
+        offset, dtype = field_offsets[operand1]
+        compare = _COMPARATORS[operator]
+
+        if dtype == "varchar" and _STRING_RE.fullmatch(operand2):
+            unpack_length = VARCHAR_LENGTH.unpack_from
+            text = operand2[1:-1]
+
+            def varchar_predicate(buffer: ByteString, start: int) -> bool:
+                value_start = start + offset + VARCHAR_LENGTH.size
+                value_end = value_start + unpack_length(buffer, start + offset)[0]
+                return compare(bytes(buffer[value_start:value_end]).decode("utf-8"), text)
+
+            return varchar_predicate
+
+        if dtype not in FIELD_FORMATS or not _NUMBER_RE.fullmatch(operand2):
+            return None
+
+        unpack_from = FIELD_FORMATS[dtype].unpack_from
+        literal = float(operand2)
+
+        return lambda buffer, start: compare(unpack_from(buffer, start + offset)[0], literal)
+
+    def compile_batch(self, field_offsets: Dict[str, Tuple[int, str]],
+                      record_size: int) -> Callable[[ByteString, int, int], List[bool]] | None:
+        """
+        Compile the condition into a predicate over a run of fixed-size records.
+        The compared column is pulled out of every record with one struct.iter_unpack pass.
+        Only conditions comparing one int or float column to a number literal are supported.
+
+        :param field_offsets: Field name -> (offset inside a record, data type), see RecordSerializer.fixed_offsets
+        :param record_size: The size of every serialized record, see RecordSerializer.fixed_size
+        :return: A predicate taking (buffer, start offset, end offset) and returning one result per record,
+                 or None if the condition is not supported
+        """
+        operand1, operator, operand2 = self.operand1.strip(), self.operator, self.operand2.strip()
+        if operand1 not in field_offsets:
+            operand1, operator, operand2 = operand2, _MIRRORED[operator], operand1
+
+        if operand1 not in field_offsets or not _NUMBER_RE.fullmatch(operand2):
+            return None
+
+        offset, dtype = field_offsets[operand1]
+        if dtype not in FIELD_FORMATS:
+            return None
+
+        field_format = FIELD_FORMATS[dtype]
+        column = struct.Struct(f"<{offset}x{field_format.format[1:]}{record_size - offset - field_format.size}x")
+        compare = _COMPARATORS[operator]
+        literal = float(operand2)
+
+        return lambda buffer, start, end: [compare(value, literal) for value, in column.iter_unpack(buffer[start:end])]
@@ -1,5 +1,8 @@
 import re
-from typing import List, Union, Dict
+from typing import Any, Callable, Dict, List, Sequence, Union
+
+# Step kinds of a compiled expression
+_LOAD, _CONSTANT, _OPERATOR = range(3)
 
 class ExpressionParser:
     def __init__(self):
@@ -58,51 +61,65 @@ class ExpressionParser:
         :param context: Optional dictionary to resolve attribute values
         :return: Postfix (Reverse Polish Notation) expression
         """
+        return self.parse_tokens(self.tokenize(expression), context)
+
+    def parse_tokens(self, tokens: List[str], context: Dict[str, Union[int, float, str]] = None) -> List[str]:
+        """
+        Parse already tokenized infix tokens using the Shunting Yard algorithm.
+        
+        :param tokens: Tokens produced by tokenize
+        :param context: Optional dictionary to resolve attribute values
+        :return: Postfix (Reverse Polish Notation) expression
+        """
         if context is None:
             context = {}
         
-        tokens = self.tokenize(expression)
-        
         output_queue = []
         operator_stack = []
+
+        prec = self.precedence
+        push_output = output_queue.append
+        push_operator = operator_stack.append
+        pop_operator = operator_stack.pop
         
         for token in tokens:
             if self.is_number(token):
-                output_queue.append(token)
+                push_output(token)
             
             elif self.is_string_literal(token):
-                output_queue.append(token)
+                push_output(token)
             
             elif self.is_attribute(token):
                 if token in context:
-                    output_queue.append(str(context[token]))
+                    push_output(str(context[token]))
                 else:
-                    output_queue.append(token)
+                    push_output(token)
             
-            elif token in self.precedence:
-                while (operator_stack and 
-                       operator_stack[-1] != '(' and 
-                       (self.precedence.get(operator_stack[-1], 0) > self.precedence.get(token, 0) or 
-                        (self.precedence.get(operator_stack[-1], 0) == self.precedence.get(token, 0)))):
-                    output_queue.append(operator_stack.pop())
-                operator_stack.append(token)
+            elif token in prec:
+                tok_prec = prec[token]
+                while operator_stack:
+                    top = operator_stack[-1]
+                    if top == '(' or prec.get(top, 0) < tok_prec:
+                        break
+                    push_output(pop_operator())
+                push_operator(token)
             
             elif token == '(':
-                operator_stack.append(token)
+                push_operator(token)
             
             elif token == ')':
                 while operator_stack and operator_stack[-1] != '(':
-                    output_queue.append(operator_stack.pop())
+                    push_output(pop_operator())
                 
                 if operator_stack and operator_stack[-1] == '(':
-                    operator_stack.pop()
+                    pop_operator()
                 else:
                     raise ValueError("Mismatched parentheses")
         
         while operator_stack:
             if operator_stack[-1] == '(':
                 raise ValueError("Mismatched parentheses")
-            output_queue.append(operator_stack.pop())
+            push_output(pop_operator())
         
         return output_queue
     
@@ -128,29 +145,38 @@ class ExpressionParser:
                 
                 right = stack.pop()
                 left = stack.pop()
-                
-                if token == '+':
-                    if isinstance(left, str) or isinstance(right, str):
-                        stack.append(str(left) + str(right))
-                    else:
-                        stack.append(left + right)
-                elif token == '-':
-                    stack.append(left - right)
-                elif token == '*':
-                    stack.append(left * right)
-                elif token == '/':
-                    if right == 0:
-                        raise ValueError("Division by zero")
-                    stack.append(left / right)
-                elif token == '%':
-                    stack.append(left % right)
-                elif token == '^':
-                    stack.append(left ** right)
+                stack.append(self.apply_operator(token, left, right))
         
         if len(stack) != 1:
             raise ValueError("Invalid expression")
         
         return stack[0]
+
+    def apply_operator(self, operator: str, left: Union[float, str], right: Union[float, str]) -> Union[float, str]:
+        """
+        Apply a binary operator to two evaluated operands.
+        
+        :param operator: One of the operators in precedence
+        :param left: The left operand
+        :param right: The right operand
+        :return: Result of the operation
+        """
+        if operator == '+':
+            if isinstance(left, str) or isinstance(right, str):
+                return str(left) + str(right)
+            return left + right
+        elif operator == '-':
+            return left - right
+        elif operator == '*':
+            return left * right
+        elif operator == '/':
+            if right == 0:
+                raise ValueError("Division by zero")
+            return left / right
+        elif operator == '%':
+            return left % right
+        elif operator == '^':
+            return left ** right
     
     def evaluate(self, expression: str, context: Dict[str, Union[int, float, str]] = None) -> Union[int, float, str]:
         """
@@ -161,4 +187,82 @@ class ExpressionParser:
         :return: Result of the expression
         """
         postfix_tokens = self.parse_expression(expression, context)
-        return self.evaluate_postfix(postfix_tokens)
\ No newline at end of file
+        return self.evaluate_postfix(postfix_tokens)
+
+    def evaluate_tokens(self, tokens: List[str], context: Dict[str, Union[int, float, str]] = None) -> Union[int, float, str]:
+        """
+        Evaluate an already tokenized expression with optional context for attributes.
+        
+        :param tokens: Tokens produced by tokenize
+        :param context: Optional dictionary to resolve attribute values
+        :return: Result of the expression
+        """
+        postfix_tokens = self.parse_tokens(tokens, context)
+        return self.evaluate_postfix(postfix_tokens)
+
+    def compile(self, expression: str, attributes: Sequence[str]) -> Callable[[Sequence[Any]], Union[int, float, str]]:
+        """
+        Parse an expression once into a function evaluating it against records.
+        The function gives the same result as evaluate with the record as context.
+        
+        :param expression: Input expression string
+        :param attributes: Attribute names of the record positions
+        :return: A function taking a record and returning the result of the expression
+        """
+        positions = {name: i for i, name in enumerate(attributes)}
+        steps = []
+
+        for token in self.parse_tokens(self.tokenize(expression)):
+            if self.is_number(token):
+                steps.append((_CONSTANT, float(token)))
+            elif token in positions:
+                steps.append((_LOAD, positions[token]))
+            elif self.is_string_literal(token):
+                steps.append((_CONSTANT, token[1:-1]))
+            elif token in self.precedence:
+                steps.append((_OPERATOR, token))
+
+        if len(steps) == 1 and steps[0][0] == _CONSTANT:
+            constant = steps[0][1]
+            return lambda record: constant
+
+        load_value = self.__load_value
+        apply_operator = self.apply_operator
+
+        def evaluate_record(record: Sequence[Any]) -> Union[int, float, str]:
+            stack = []
+            for kind, argument in steps:
+                if kind == _LOAD:
+                    load_value(stack, record[argument])
+                elif kind == _CONSTANT:
+                    stack.append(argument)
+                else:
+                    if len(stack) < 2:
+                        raise ValueError("Invalid expression")
+                    right = stack.pop()
+                    left = stack.pop()
+                    stack.append(apply_operator(argument, left, right))
+
+            if len(stack) != 1:
+                raise ValueError("Invalid expression")
+
+            return stack[0]
+
+        return evaluate_record
+
+    def __load_value(self, stack: List[Union[float, str]], value: Any) -> None:
+        """
+        Push an attribute value the way evaluate_postfix reads it after substitution.
+
+        :param stack: The evaluation stack
+        :param value: The attribute value from the record
+        """
+        if isinstance(value, (int, float)):
+            stack.append(float(value))
+            return
+
+        token = str(value)
+        if self.is_number(token):
+            stack.append(float(token))
+        elif self.is_string_literal(token):
+            stack.append(token[1:-1])
@@ -1,4 +1,48 @@
-from typing import List, Tuple, Any, ByteString
+import struct
+from typing import List, Tuple, Any, ByteString, Callable, Dict
+
+# Every serialized record starts with its length (excluding these bytes)
+RECORD_LENGTH_SIZE = 2
+RECORD_LENGTH = struct.Struct("<H")
+
+# Fixed-width numeric fields, as laid out inside a serialized record
+FIELD_FORMATS = {"int": struct.Struct("<i"), "float": struct.Struct("<f")}
+
+# Little-endian integer layouts by (size, signed)
+INT_FORMATS = {
+    (size, signed): struct.Struct("<" + (code if signed else code.upper()))
+    for size, code in ((1, "b"), (2, "h"), (4, "i"), (8, "q"))
+    for signed in (True, False)
+}
+
+# Length of a varchar field, stored before its encoded characters
+VARCHAR_LENGTH = INT_FORMATS[(2, False)]
+
+
+def _encode_char(value: str) -> bytes:
+    """
+    Encode a char field value for packing with a Struct "s" format, which pads it with nulls.
+
+    :param value: The single character to encode.
+    :return: The encoded character.
+    """
+    assert len(value) == 1
+    return value.encode('utf-8')
+
+
+# Encoders and decoders of fields outside the packed prefix, by data type
+FIELD_ENCODERS: Dict[str, Callable[["DtypeEncoder", Any, int], bytes]] = {
+    "int": lambda encoder, value, size: encoder.encodeInt(int(value), size, True),
+    "float": lambda encoder, value, size: encoder.encodeFloat(float(value)),
+    "char": lambda encoder, value, size: _encode_char(value).ljust(size, b'\x00'),
+    "varchar": lambda encoder, value, size: encoder.encodeVarChar(value, size),
+}
+FIELD_DECODERS: Dict[str, Callable[["DtypeEncoder", ByteString, int, int], Tuple[Any, int]]] = {
+    "int": lambda encoder, data, offset, size: encoder.decodeInt(data, offset, size, signed=True),
+    "float": lambda encoder, data, offset, size: encoder.decodeFloat(data, offset),
+    "char": lambda encoder, data, offset, size: encoder.decodeChar(data, offset, size),
+    "varchar": lambda encoder, data, offset, size: encoder.decodeVarChar(data, offset),
+}
 
 
 class DtypeEncoder:
@@ -21,6 +65,10 @@ class DtypeEncoder:
         :param signed: Whether the integer is signed.
         :return: The encoded integer as bytes.
         """
+        int_format = INT_FORMATS.get((bytes, signed))
+        if int_format is not None:
+            return int_format.pack(num)
+
         return num.to_bytes(bytes, byteorder='little', signed=signed)
 
     def decodeInt(self, byte_data: ByteString, offset: int, bytes: int, signed: bool) -> Tuple[int, int]:
@@ -33,6 +81,10 @@ class DtypeEncoder:
         :param signed: Whether the integer is signed.
         :return: A tuple containing the decoded integer and the new offset.
         """
+        int_format = INT_FORMATS.get((bytes, signed))
+        if int_format is not None:
+            return int_format.unpack_from(byte_data, offset)[0], offset + bytes
+
         value = int.from_bytes(byte_data[offset:offset + bytes], byteorder='little', signed=signed)
         return value, offset + bytes
 
@@ -43,8 +95,7 @@ class DtypeEncoder:
         :param num: The float to encode.
         :return: The encoded float as bytes.
         """
-        int_rep = self.__float_to_int(num)
-        return self.encodeInt(int_rep, 4, signed=True)
+        return FIELD_FORMATS["float"].pack(num)
 
     def decodeFloat(self, byte_data: ByteString, offset: int) -> Tuple[float, int]:
         """
@@ -54,8 +105,7 @@ class DtypeEncoder:
         :param offset: The offset to start reading from.
         :return: A tuple containing the decoded float and the new offset.
         """
-        int_rep, new_offset = self.decodeInt(byte_data, offset, 4, signed=True)
-        return self.__int_to_float(int_rep), new_offset
+        return FIELD_FORMATS["float"].unpack_from(byte_data, offset)[0], offset + 4
 
     def encodeChar(self, char: str, size: int = 1) -> bytes:
         """
@@ -77,7 +127,7 @@ class DtypeEncoder:
         :param size: The size of the encoded character.
         :return: A tuple containing the decoded character and the new offset.
         """
-        value = byte_data[offset:offset + size].decode('utf-8').rstrip('\x00')
+        value = str(byte_data[offset:offset + size], 'utf-8').rstrip('\x00')
         return value, offset + size
 
     def encodeVarChar(self, char: str, max_size: int) -> bytes:
@@ -89,14 +139,14 @@ class DtypeEncoder:
         :return: The encoded string as bytes.
         :raises ValueError: If the string length exceeds max_size.
         """
-        if (char[0] == '\'' and char[-1] == '\'') :
+        char = str(char)
+        if len(char) >= 2 and char[0] == '\'' and char[-1] == '\'':
             char = char[1:-1]
         encoded = char.encode('utf-8')
         length = len(encoded)
         if length > max_size:
             raise ValueError(f"String length {length} exceeds maximum allowed size {max_size}.")
-        length_bytes = self.encodeInt(length, 2, signed=False)
-        return length_bytes + encoded
+        return VARCHAR_LENGTH.pack(length) + encoded
 
     def decodeVarChar(self, byte_data: ByteString, offset: int) -> Tuple[str, int]:
         """
@@ -106,31 +156,12 @@ class DtypeEncoder:
         :param offset: The offset to start reading from.
         :return: A tuple containing the decoded string and the new offset.
         """
-        length, new_offset = self.decodeInt(byte_data, offset, 2, signed=False)
-        value = byte_data[new_offset:new_offset + length].decode('utf-8')
+        length = VARCHAR_LENGTH.unpack_from(byte_data, offset)[0]
+        new_offset = offset + VARCHAR_LENGTH.size
+        value = str(byte_data[new_offset:new_offset + length], 'utf-8')
         value = f"'{value}'"
         return value, new_offset + length
 
-    def __float_to_int(self, num: float) -> int:
-        """
-        Convert a float to its integer representation (IEEE 754 format).
-
-        :param num: The float to convert.
-        :return: The integer representation of the float.
-        """
-        import struct
-        return struct.unpack('<I', struct.pack('<f', num))[0]
-
-    def __int_to_float(self, int_rep: int) -> float:
-        """
-        Convert an integer (IEEE 754 format) to a float.
-
-        :param int_rep: The integer representation of the float.
-        :return: The converted float.
-        """
-        import struct
-        return struct.unpack('<f', struct.pack('<I', int_rep))[0]
-
 
 class RecordSerializer:
     """
@@ -146,6 +177,42 @@ class RecordSerializer:
         self.schema = schema
         self.encoder = DtypeEncoder()
 
+        # The fields before the first varchar are packed with one precompiled Struct
+        prefix_format = "<"
+        self.prefix_encoders: List[Callable[[Any], Any]] = []
+        self.prefix_chars: List[int] = []
+        for name, dtype, size in schema:
+            if dtype == 'int' and (size, True) in INT_FORMATS:
+                prefix_format += INT_FORMATS[(size, True)].format[1:]
+                self.prefix_encoders.append(int)
+            elif dtype == 'float':
+                prefix_format += "f"
+                self.prefix_encoders.append(float)
+            elif dtype == 'char':
+                prefix_format += f"{size}s"
+                self.prefix_chars.append(len(self.prefix_encoders))
+                self.prefix_encoders.append(_encode_char)
+            else:
+                break
+        self.prefix_struct = struct.Struct(prefix_format)
+        self.prefix_count = len(self.prefix_encoders)
+
+        # The remaining fields are encoded one by one, with their coders resolved once here
+        self.suffix_encoders: List[Tuple[Callable, int]] = []
+        self.suffix_decoders: List[Tuple[Callable, int]] = []
+        for name, dtype, size in schema[self.prefix_count:]:
+            if dtype not in FIELD_ENCODERS:
+                raise ValueError(f"Unsupported data type: {dtype}")
+            self.suffix_encoders.append((FIELD_ENCODERS[dtype], size))
+            self.suffix_decoders.append((FIELD_DECODERS[dtype], size))
+
+        # Whole records, when every field is in the prefix
+        self.record_struct: struct.Struct | None = None
+        self.packed_record_struct: struct.Struct | None = None
+        if self.prefix_count == len(schema):
+            self.record_struct = struct.Struct(f"<{RECORD_LENGTH_SIZE + 2}x" + prefix_format[1:])
+            self.packed_record_struct = struct.Struct("<H2s" + prefix_format[1:])
+
     def serialize(self, record: Tuple[Any, ...]) -> bytearray:
         """
         Serialize a record into a binary format.
@@ -154,23 +221,87 @@ class RecordSerializer:
         :return: The serialized record as a bytearray.
         :raises ValueError: If the record contains invalid data for the schema.
         """
-        record_bytes = bytearray()
-        for value, (name, dtype, size) in zip(record, self.schema):
-            if dtype == 'int':
-                value = int(value)
-                record_bytes.extend(self.encoder.encodeInt(value, size, True))
-            elif dtype == 'float':
-                value = float(value)
-                record_bytes.extend(self.encoder.encodeFloat(value))
-            elif dtype == 'char':
-                assert len(value) == 1
-                record_bytes.extend(self.encoder.encodeChar(value, size))
-            elif dtype == 'varchar':
-                assert len(value) <= size
-                record_bytes.extend(self.encoder.encodeVarChar(value, size))
-            else:
-                raise ValueError(f"Unsupported data type: {dtype}")
-        return bytearray([ord("R"), ord("C")]) + record_bytes + bytearray([0xCC])
+        record_bytes = bytearray(RECORD_LENGTH_SIZE) + b"RC"
+        record_bytes += self.prefix_struct.pack(
+            *[encode(value) for encode, value in zip(self.prefix_encoders, record)])
+
+        encoder = self.encoder
+        for value, (encode, size) in zip(record[self.prefix_count:], self.suffix_encoders):
+            record_bytes += encode(encoder, value, size)
+        RECORD_LENGTH.pack_into(record_bytes, 0, len(record_bytes) - RECORD_LENGTH_SIZE)
+        return record_bytes
+
+    def serialize_batch(self, records: List[Tuple[Any, ...]]) -> bytearray:
+        """
+        Serialize records back to back into one buffer.
+        Records of fixed-size schemas are packed into a preallocated buffer with one precompiled Struct.
+
+        :param records: The records to serialize, as tuples of values.
+        :return: The serialized records, in order, as a bytearray.
+        :raises ValueError: If a record contains invalid data for the schema.
+        """
+        if self.packed_record_struct is None:
+            return bytearray().join(self.serialize(record) for record in records)
+
+        pack_into = self.packed_record_struct.pack_into
+        size = self.packed_record_struct.size
+        length = size - RECORD_LENGTH_SIZE
+        encoders = self.prefix_encoders
+
+        records_bytes = bytearray(size * len(records))
+        for offset, record in zip(range(0, len(records_bytes), size), records):
+            pack_into(records_bytes, offset, length, b"RC",
+                      *[encode(value) for encode, value in zip(encoders, record)])
+        return records_bytes
+
+    def fixed_offsets(self) -> Dict[str, Tuple[int, str]]:
+        """
+        Get the fields whose position inside a serialized record is the same for every record,
+        i.e. the fields before the first varchar.
+
+        :return: A mapping of field name to (offset from the start of the record, data type).
+        """
+        offsets = {}
+        offset = RECORD_LENGTH_SIZE + 2
+        for name, dtype, size in self.schema:
+            offsets[name] = (offset, dtype)
+            if dtype == 'varchar':
+                break
+            offset += size
+        return offsets
+
+    def fixed_size(self) -> int | None:
+        """
+        Get the serialized size of every record when the schema has no varchar fields.
+
+        :return: The record size in bytes, including the length prefix, or None if records vary in size.
+        """
+        size = RECORD_LENGTH_SIZE + 2
+        for name, dtype, attr_size in self.schema:
+            if dtype == 'varchar':
+                return None
+            size += attr_size
+        return size
+
+    def deserialize_columns(self, buffer: ByteString, spans: List[Tuple[int, int]]) -> List[Tuple[Any, ...]]:
+        """
+        Deserialize consecutive records into one tuple of values per field.
+        Records of fixed-size schemas are unpacked in a single struct.iter_unpack pass.
+
+        :param buffer: The binary data holding the records.
+        :param spans: (start, end) offsets of the records in buffer, back to back.
+        :return: The values of every field, in schema order, or an empty list if there are no records.
+        """
+        if not spans:
+            return []
+
+        if self.record_struct is None:
+            return list(zip(*(self.deserialize(buffer[start:end]) for start, end in spans)))
+
+        columns = list(zip(*self.record_struct.iter_unpack(buffer[spans[0][0]:spans[-1][1]])))
+        for i in self.prefix_chars:
+            columns[i] = tuple(value.decode('utf-8').rstrip('\x00') for value in columns[i])
+        return columns
 
     def deserialize(self, record_bytes: ByteString) -> Tuple[Any, ...]:
         """
@@ -180,26 +311,20 @@ class RecordSerializer:
         :return: The deserialized record as a tuple of values.
         :raises ValueError: If the binary format is invalid or does not match the schema.
         """
-        if record_bytes[0:2] != b"RC":
+        length = RECORD_LENGTH.unpack_from(record_bytes, 0)[0]
+        if length != len(record_bytes) - RECORD_LENGTH_SIZE:
+            raise ValueError("Invalid Record Length")
+        if record_bytes[RECORD_LENGTH_SIZE:RECORD_LENGTH_SIZE + 2] != b"RC":
             raise ValueError("Invalid Record Header")
-        if record_bytes[-1] != 0xCC:
-            raise ValueError("Invalid Sentinel")
-
-        record = []
-        offset = 2
 
-        for name, dtype, size in self.schema:
-            if dtype == 'int':
-                value, offset = self.encoder.decodeInt(record_bytes, offset, size, signed=True)
-            elif dtype == 'float':
-                value, offset = self.encoder.decodeFloat(record_bytes, offset)
-            elif dtype == 'char':
-                value, offset = self.encoder.decodeChar(record_bytes, offset, size)
-            elif dtype == 'varchar':
-                value, offset = self.encoder.decodeVarChar(record_bytes, offset)
-            else:
-                raise ValueError(f"Unsupported data type: {dtype}")
+        record = list(self.prefix_struct.unpack_from(record_bytes, RECORD_LENGTH_SIZE + 2))
+        for i in self.prefix_chars:
+            record[i] = record[i].decode('utf-8').rstrip('\x00')
+        offset = RECORD_LENGTH_SIZE + 2 + self.prefix_struct.size
 
+        encoder = self.encoder
+        for decode, size in self.suffix_decoders:
+            value, offset = decode(encoder, record_bytes, offset, size)
             record.append(value)
 
         return tuple(record)
@@ -1,7 +1,11 @@
+import struct
 from typing import List
 
 from .Attribute import Attribute
 
+# Lengths and sizes in a serialized schema are little-endian uint16
+UINT16 = struct.Struct("<H")
+
 
 class Schema:
     """
@@ -40,13 +44,12 @@ class Schema:
 
         :return: Serialized schema as a bytearray.
         """
+        pack = UINT16.pack
         schema_bytes = bytearray()
         for attr in self.attributes:
-            schema_bytes.extend(len(attr.name).to_bytes(2, byteorder='little'))
-            schema_bytes.extend(attr.name.encode('utf-8'))
-            schema_bytes.extend(len(attr.dtype).to_bytes(2, byteorder='little'))
-            schema_bytes.extend(attr.dtype.encode('utf-8'))
-            schema_bytes.extend(attr.size.to_bytes(2, byteorder='little'))
+            name = attr.name.encode('utf-8')
+            dtype = attr.dtype.encode('utf-8')
+            schema_bytes += pack(len(name)) + name + pack(len(dtype)) + dtype + pack(attr.size)
         return schema_bytes
 
     @staticmethod
@@ -57,20 +60,21 @@ class Schema:
         :param data: Serialized schema data.
         :return: Schema object.
         """
+        unpack_from = UINT16.unpack_from
         attributes = []
         offset = 0
         while offset < len(data):
-            name_len = int.from_bytes(data[offset:offset + 2], byteorder='little')
+            name_len = unpack_from(data, offset)[0]
             offset += 2
-            name = data[offset:offset + name_len].decode('utf-8')
+            name = bytes(data[offset:offset + name_len]).decode('utf-8')
             offset += name_len
 
-            dtype_len = int.from_bytes(data[offset:offset + 2], byteorder='little')
+            dtype_len = unpack_from(data, offset)[0]
             offset += 2
-            dtype = data[offset:offset + dtype_len].decode('utf-8')
+            dtype = bytes(data[offset:offset + dtype_len]).decode('utf-8')
             offset += dtype_len
 
-            size = int.from_bytes(data[offset:offset + 2], byteorder='little')
+            size = unpack_from(data, offset)[0]
             offset += 2
 
             attributes.append(Attribute(name, dtype, size))
@@ -1,16 +1,26 @@
 import sys
 import os
-from typing import List, Tuple, Any
+import mmap
+import struct
+from typing import List, Tuple, Any, BinaryIO, ByteString, Callable, Dict, Iterator
 
-from .RecordSerializer import RecordSerializer
-from .Block import Block, BLOCK_SIZE
+from .RecordSerializer import RecordSerializer, FIELD_FORMATS, RECORD_LENGTH, RECORD_LENGTH_SIZE, VARCHAR_LENGTH
+from .Block import Block, BLOCK_SIZE, BLOCK_HEADER_SIZE
 from .Schema import Schema
+from .Attribute import MAX_FIELD_SIZE
 from .Condition import Condition
 from .Expression import ExpressionParser
 
 sys.path.append("./Failure_Recovery")
 from Failure_Recovery.FailureRecoveryManager import FailureRecoveryManager
 
+# Magic numbers of the table header; LEGACY files store 0xCC-terminated records
+HEADER_MAGIC = b"HDR2"
+LEGACY_HEADER_MAGIC = b"HEAD"
+
+# Number of blocks fetched at once by sequential scans
+SCAN_BATCH_BLOCKS = 64
+
 
 class TableFileManager:
     """
@@ -18,39 +28,61 @@ class TableFileManager:
     """
 
     base_path: str = "storage"
+    shared_failure_recovery: FailureRecoveryManager | None = None
 
-    def __init__(self, table_name: str, schema: Schema = None, block_size: int = BLOCK_SIZE) -> None:
+    def __init__(self, table_name: str, schema: Schema = None, block_size: int = BLOCK_SIZE,
+                 failure_recovery: FailureRecoveryManager | None = None) -> None:
         """
         Initialize the TableFileManager.
 
         :param table_name: The name of the table.
         :param schema: The schema of the table as a list of tuples (name, type, size).
         :param block_size: The size of each block, in bytes.
+        :param failure_recovery: The FailureRecoveryManager owning the buffer; defaults to the shared one.
         :raises ValueError: If schema is not provided for a new table.
         """
-        self.table_name: str = table_name
-
         if (table_name[0] == "'" and table_name[-1] == "'") :
             table_name = table_name[1:-1]
 
+        self.table_name: str = table_name
+
         self.block_size: int = block_size
         self.file_path: str = f"{TableFileManager.base_path}/{table_name}_table.bin"
         self.schema: Schema = schema if schema else Schema([])
 
-        self.failure_recovery: FailureRecoveryManager = FailureRecoveryManager()  # NANTI KALO UDAH INTEGRASI DIJADIIN PARAMETER TERUS DIPASS SAMA PROCESSOR, JADI FAILUREMANAGER NYA SAMA, GA BIKIN BARU
+        self.failure_recovery: FailureRecoveryManager = failure_recovery or TableFileManager.get_failure_recovery()
+        self.dirty_blocks: Dict[int, Block] = {}
+        self.header_dirty: bool = False
+        self.mapped_file: mmap.mmap | None = None
+        self.write_file: BinaryIO | None = None
+        self.expression_parser: ExpressionParser = ExpressionParser()
 
         if os.path.exists(self.file_path):
-            self.__read_header()
-            self.serializer: RecordSerializer = RecordSerializer(self.schema.get_metadata())
+            magic = self.__read_header()
+            self.__bind_schema()
+            if magic == LEGACY_HEADER_MAGIC:
+                self.__migrate_legacy_file()
         elif schema:
             self.schema: Schema = schema
             self.record_count: int = 0
             self.block_count: int = 1
-            self.serializer: RecordSerializer = RecordSerializer(schema.get_metadata())
+            self.__bind_schema()
             self.__write_header()
         else:
             raise ValueError("Schema must be provided when creating a new table.")
 
+    @classmethod
+    def get_failure_recovery(cls) -> FailureRecoveryManager:
+        """
+        Get the FailureRecoveryManager shared by every TableFileManager, so all
+        tables go through the same buffer.
+
+        :return: The shared FailureRecoveryManager.
+        """
+        if cls.shared_failure_recovery is None:
+            cls.shared_failure_recovery = FailureRecoveryManager()
+        return cls.shared_failure_recovery
+
     def init_file(self) -> None:
         """
         Initialize the table file.
@@ -63,32 +95,49 @@ class TableFileManager:
     def write_table(self, records: List[Tuple[Any, ...]]) -> None:
         """
         Write records to the binary file, appending new blocks as needed.
+        Every block touched is written back in a single write by flush.
 
         :param records: A list of records, each as a tuple matching the schema.
         :return: None
         :raises ValueError: If a record cannot be serialized.
         """
-        current_page = self.block_count - 1
-        block = self.__get_block(current_page)
+        if not records:
+            return
 
-        for record in records:
-            record_bytes = self.serializer.serialize(record)
+        first_page = self.block_count - 1
+        block = self.__get_block(first_page)
+        dirty_blocks = [block]
 
-            try:
-                block.add_record(record_bytes)
-            except ValueError:
-                self.set_buffer(self.table_name, current_page, block)
-                block = Block()
-                current_page += 1
-                self.block_count += 1
-                block.reset_header()
-                block.add_record(record_bytes)
+        if self.record_size is not None:
+            # Fixed-size records are packed in one batch and copied into each block as a run
+            record_size = self.record_size
+            records_bytes = memoryview(self.serializer.serialize_batch(records))
+            offset = 0
+            while offset < len(records_bytes):
+                run_size = min(block.capacity() // record_size * record_size, len(records_bytes) - offset)
+                if run_size == 0:
+                    block = Block()
+                    dirty_blocks.append(block)
+                    continue
+
+                block.add_records(records_bytes[offset:offset + run_size], run_size // record_size)
+                offset += run_size
+        else:
+            for record in records:
+                record_bytes = self.serializer.serialize(record)
+
+                if block.capacity() < len(record_bytes):
+                    block = Block()
+                    dirty_blocks.append(block)
 
-        if block.header["record_count"] > 0:
-            self.__set_block(current_page, block)
+                block.add_record(record_bytes)
 
+        self.block_count = first_page + len(dirty_blocks)
         self.record_count += len(records)
+
+        self.__set_blocks(first_page, dirty_blocks)
         self.__update_header()
+        self.flush()
 
     def read_table(self) -> List[Tuple[Any, ...]]:
         """
@@ -97,117 +146,107 @@ class TableFileManager:
         :return: A list of records as tuples matching the schema.
         :raises ValueError: If a record cannot be deserialized.
         """
-        records: List[Tuple[Any, ...]] = []
-        current_block = 0
-
-        while current_block < self.block_count:
-            block: Block = self.__get_block(current_block)
-            offset = 0
-
-            if current_block == 0:
-                header_length = int.from_bytes(block.data[4:8], byteorder='little')
-                offset = header_length
-
-            while offset < block.header["free_space_offset"]:
-                record_bytes = bytearray()
-
-                while block.data[offset] != 0xCC:
-                    record_bytes.append(block.data[offset])
-                    offset += 1
+        return list(self.iter_records())
 
-                record_bytes.append(block.data[offset])
-                offset += 1
+    def iter_records(self) -> Iterator[Tuple[Any, ...]]:
+        """
+        Iterate over all records in the binary file without materializing them.
 
-                record = self.serializer.deserialize(record_bytes)
-                records.append(record)
+        :return: An iterator of records as tuples matching the schema.
+        :raises ValueError: If a record cannot be deserialized.
+        """
+        for current_block, block in self.__iter_blocks(0, self.block_count):
+            with memoryview(block.data) as view:
+                for start, end in self.__record_spans(current_block, block):
+                    yield self.serializer.deserialize(view[start:end])
 
-            current_block += 1
+    def iter_columns(self) -> Iterator[List[Tuple[Any, ...]]]:
+        """
+        Iterate over the records of each block, transposed into one tuple of values per attribute.
 
-        return records
+        :return: An iterator of per-block columns, in schema order.
+        :raises ValueError: If a record cannot be deserialized.
+        """
+        for current_block, block in self.__iter_blocks(0, self.block_count):
+            with memoryview(block.data) as view:
+                yield self.serializer.deserialize_columns(view, self.__record_spans(current_block, block))
 
     def delete_record(self, condition: Condition) -> int:
         """
         Delete records that match the specified condition within the existing blocks.
 
+        Blocks before the first deleted record are left untouched; the surviving records
+        from there onwards are repacked and written back in a single write.
+
         :param condition: Condition to evaluate for deleting records
         :return: Number of rows deleted
         """
         rows_effected = 0
-        current_block = 0
 
-        rewrite_block = Block()
-        rewrite_block_num = -1
+        blocks = self.__get_blocks(0, self.block_count)
+        header_bytes = blocks[0].data[0:self.header_length]
 
-        first_block = self.__get_block(0)
-        header_length = int.from_bytes(first_block.data[4:8], byteorder='little')
-        rewrite_block.add_record(first_block.data[0:header_length])
-
-        attributes = [attr[0] for attr in self.schema.get_metadata()]
-
-        while current_block < self.block_count:
-            block: Block = self.__get_block(current_block)
-            block.init_cursor()
-            offset = 0
-
-            if current_block == 0:
-                header_length = int.from_bytes(block.data[4:8], byteorder='little')
-                block.cursor = header_length
-                offset = header_length
-
-            while offset < block.header["free_space_offset"]:
-                record_bytes = bytearray()
+        rewrite_from = -1
+        rewrite_blocks: List[Block] = []
 
-                while block.data[offset] != 0xCC:
-                    record_bytes.append(block.data[offset])
-                    offset += 1
-                record_bytes.append(block.data[offset])
-                offset += 1
+        attributes = self.attribute_names
+        raw_predicate = condition.compile(self.serializer.fixed_offsets())
+        batch_predicate = self.__compile_batch(condition)
 
-                record = self.serializer.deserialize(record_bytes)
-
-                context = {}
-                for attr, value in zip(attributes, record):
-                    context[attr] = value
+        for current_block, block in enumerate(blocks):
+            spans = self.__record_spans(current_block, block)
+            view = memoryview(block.data)
 
+            if batch_predicate is not None:
+                delete_mask = batch_predicate(view, spans[0][0], spans[-1][1]) if spans else []
+            elif raw_predicate is not None:
+                delete_mask = [raw_predicate(view, start) for start, _ in spans]
+            else:
+                block_records = [self.serializer.deserialize(view[start:end]) for start, end in spans]
                 try:
-                    should_delete = condition.evaluate(context)
+                    delete_mask = condition.evaluate_batch(block_records, attributes)
                 except ValueError as e:
                     raise ValueError(f"Error evaluating condition: {e}")
 
-                if rewrite_block_num == -1 and should_delete:
-                    rewrite_block_num = current_block
-                    if current_block != 0:
-                        header_length = int.from_bytes(block.data[4:8], byteorder='little')
-                        rewrite_block.data[0:len(rewrite_block.data) - header_length] = rewrite_block.data[
-                                                                                        header_length:]
-                        rewrite_block.header["free_space_offset"] -= header_length
-
-                if not should_delete:
-                    serialized_record = self.serializer.serialize(record)
-
-                    if rewrite_block.capacity() < len(serialized_record):
-                        self.__set_block(rewrite_block_num, rewrite_block)
-
-                        rewrite_block = Block()
-                        rewrite_block_num += 1
-
-                    rewrite_block.add_record(serialized_record)
-                else:
-                    rows_effected += 1
-
-            current_block += 1
-
-        if rewrite_block.header["record_count"] > 0:
-            self.__set_block(rewrite_block_num, rewrite_block)
-
-        for i in range(rewrite_block_num + 1, self.block_count) :
-            empty_block = Block()
-            self.__set_block(i, empty_block)
-
-        self.block_count = rewrite_block_num + 1
+            if rewrite_from == -1:
+                if not any(delete_mask):
+                    continue
+                rewrite_from = current_block
+                rewrite_blocks.append(Block())
+                if current_block == 0:
+                    rewrite_blocks[0].add_record(header_bytes)
+
+            survivors = [span for span, should_delete in zip(spans, delete_mask) if not should_delete]
+            rows_effected += len(spans) - len(survivors)
+
+            # Copy each run of adjacent survivors that fits the rewrite block in one slice
+            target = rewrite_blocks[-1]
+            run_start = run_end = run_count = 0
+            for start, end in survivors:
+                if run_count and start == run_end and target.capacity() >= end - run_start:
+                    run_end = end
+                    run_count += 1
+                    continue
+
+                if run_count:
+                    target.add_records(view[run_start:run_end], run_count)
+                if target.capacity() < end - start:
+                    target = Block()
+                    rewrite_blocks.append(target)
+                run_start, run_end, run_count = start, end, 1
+
+            if run_count:
+                target.add_records(view[run_start:run_end], run_count)
+
+        if rewrite_from == -1:
+            return 0
+
+        self.__set_blocks(rewrite_from, rewrite_blocks)
+        self.__truncate(rewrite_from + len(rewrite_blocks))
         self.record_count -= rows_effected
 
         self.__update_header()
+        self.flush()
 
         return rows_effected
 
@@ -215,74 +254,177 @@ class TableFileManager:
         """
         Update records that match the specified condition.
 
+        Simple conditions are tested on the raw record bytes, so only matching records are
+        deserialized. When only int and float fields at fixed offsets are updated, only those
+        fields are packed. Other updated records that keep their serialized size are patched
+        in place and only the blocks holding them are written. Once a record changes size,
+        every record from that block onwards is repacked. Blocks are only changed once every
+        record has been updated.
+
         :param update_values: Dictionary of column names and their new values to update
         :param condition: Condition to evaluate for updating records
         :return: Number of rows affected by the update operation
         """
+        parser = self.expression_parser
 
-        parser = ExpressionParser()
-
-        records = self.read_table()
         rows_affected = 0
-        attributes = [attr[0] for attr in self.schema.get_metadata()]
-
-        updated_records = []
-
-        for record in records:
-            record_list = list(record)
-
-            context = {}
-            for attr, value in zip(attributes, record):
-                context[attr] = value
-
-            if not condition or condition.evaluate(context) :
-                for col_name, new_value in update_values.items():
-                    col_index = next(
-                        (i for i, attr in enumerate(self.schema.attributes)
-                            if attr.name == col_name),
-                        None
-                    )
-                    if col_index is not None:
-                        record_list[col_index] = parser.evaluate(new_value, context)
-                rows_affected += 1
-
-            updated_records.append(tuple(record_list))
+        attributes = self.attribute_names
+
+        name_to_index = self.name_to_index
+        updates_idx = [(name_to_index[col_name], new_value, parser.compile(new_value, attributes))
+                       for col_name, new_value in update_values.items() if col_name in name_to_index]
+        if not updates_idx:
+            return 0
+
+        rewrite_from = -1
+        rewrite_blocks: List[Block] = []
+
+        raw_predicate = condition.compile(self.serializer.fixed_offsets()) if condition else None
+        batch_predicate = self.__compile_batch(condition) if condition else None
+        field_updates = self.__field_updates(updates_idx, parser)
+        needs_record = field_updates is None or any(constant is None for *_, constant in field_updates)
+
+        # New record bytes are collected as (offset, bytes) patches per block and only
+        # applied once every record has been updated, so a failing update leaves the table as it was
+        patched_blocks: List[Tuple[int, Block, List[Tuple[int, ByteString]]]] = []
+
+        for current_block, block in self.__iter_blocks(0, self.block_count):
+            spans = self.__record_spans(current_block, block)
+            view = memoryview(block.data)
+            block_records = None
+
+            if not condition:
+                update_mask = [True] * len(spans)
+            elif batch_predicate is not None:
+                update_mask = batch_predicate(view, spans[0][0], spans[-1][1]) if spans else []
+            elif raw_predicate is not None:
+                update_mask = [raw_predicate(view, start) for start, _ in spans]
+            else:
+                block_records = [self.serializer.deserialize(view[start:end]) for start, end in spans]
+                try:
+                    update_mask = condition.evaluate_batch(block_records, attributes)
+                except ValueError as e:
+                    raise ValueError(f"Error evaluating condition: {e}")
 
-        for i in range(self.block_count) :
-            empty_block = Block()
-            self.__set_block(i, empty_block)
+            patches = []
+            for i, ((start, end), should_update) in enumerate(zip(spans, update_mask)):
+                if should_update and field_updates is not None:
+                    if needs_record:
+                        if block_records is not None:
+                            record = block_records[i]
+                        else:
+                            record = self.serializer.deserialize(view[start:end])
+                    for field_offset, pack, cast, evaluate, constant in field_updates:
+                        value = constant if constant is not None else evaluate(record)
+                        try:
+                            patches.append((start + field_offset, pack(cast(value))))
+                        except (struct.error, OverflowError) as e:
+                            raise ValueError(f"Invalid value {value} for an updated field: {e}")
+                    rows_affected += 1
+                    continue
+
+                if should_update:
+                    if block_records is not None:
+                        record = block_records[i]
+                    else:
+                        record = self.serializer.deserialize(view[start:end])
+                    record_list = list(record)
+                    for col_index, _, evaluate in updates_idx:
+                        record_list[col_index] = evaluate(record)
+                    try:
+                        record_bytes = self.serializer.serialize(tuple(record_list))
+                    except (struct.error, OverflowError) as e:
+                        raise ValueError(f"Invalid value for an updated field: {e}")
+                    rows_affected += 1
+                else:
+                    record_bytes = view[start:end]
+
+                if rewrite_from == -1 and len(record_bytes) != end - start:
+                    rewrite_from = current_block
+                    rewrite_blocks.append(Block())
+                    if current_block == 0:
+                        rewrite_blocks[0].add_record(block.data[0:self.header_length])
+                    if i:
+                        kept = bytearray(view[spans[0][0]:start])
+                        for offset, patch in patches:
+                            offset -= spans[0][0]
+                            kept[offset:offset + len(patch)] = patch
+                        rewrite_blocks[0].add_records(kept, i)
+                    patches = []
+
+                if rewrite_from != -1:
+                    if rewrite_blocks[-1].capacity() < len(record_bytes):
+                        rewrite_blocks.append(Block())
+                    rewrite_blocks[-1].add_record(record_bytes)
+                elif should_update:
+                    patches.append((start, record_bytes))
+
+            if patches:
+                patched_blocks.append((current_block, block, patches))
+
+        for current_block, block, patches in patched_blocks:
+            for offset, patch in patches:
+                block.data[offset:offset + len(patch)] = patch
+            self.__set_block(current_block, block)
+
+        if rewrite_from != -1:
+            self.__set_blocks(rewrite_from, rewrite_blocks)
+            self.__truncate(rewrite_from + len(rewrite_blocks))
+            self.__update_header()
+
+        self.flush()
 
-        self.block_count = 1
-        self.record_count = 0
+        return rows_affected
 
-        with open(self.file_path, 'wb') as _:
-            pass
+    def flush(self) -> None:
+        """
+        Write the dirty blocks to disk, one write per run of consecutive block numbers.
+        If block 0 is not dirty but the header counts changed, only those bytes are written.
 
-        self.__write_header()
-        self.write_table(updated_records)
+        :return: None
+        """
+        if not self.dirty_blocks and not self.header_dirty:
+            return
+
+        self.__release_mapped_file()
+        fd = self.__get_write_file()
+        block_numbers = sorted(self.dirty_blocks)
+
+        run_start = 0
+        for i in range(1, len(block_numbers) + 1):
+            if i == len(block_numbers) or block_numbers[i] != block_numbers[i - 1] + 1:
+                run = [self.dirty_blocks[n] for n in block_numbers[run_start:i]]
+                Block.write_blocks_to(fd, block_numbers[run_start], run)
+                for block in run:
+                    block.dirty = False
+                run_start = i
+
+        if self.header_dirty and 0 not in self.dirty_blocks:
+            fd.seek(BLOCK_HEADER_SIZE + 8)
+            fd.write(self.record_count.to_bytes(4, "little") + self.block_count.to_bytes(2, "little"))
+
+        fd.flush()
+        self.dirty_blocks.clear()
+        self.header_dirty = False
+
+    def close(self) -> None:
+        """
+        Release the memory map and the open handle of the table file, e.g. before the file is removed.
 
-        return rows_affected
+        :return: None
+        """
+        self.__release_mapped_file()
+        if self.write_file is not None:
+            self.write_file.close()
+            self.write_file = None
 
     def get_max_record_size(self) -> int:
         """
-        Calculate the maximum size of a single record based on the schema.
+        Get the maximum size of a single record based on the schema.
 
         :return: The maximum size of a record, in bytes.
-        :raises ValueError: If an unsupported data type is encountered.
         """
-        record_size = 0
-        for attr in self.schema.attributes:
-            if attr.dtype == 'int':
-                record_size += 4
-            elif attr.dtype == 'float':
-                record_size += 4
-            elif attr.dtype == 'char':
-                record_size += attr.size
-            elif attr.dtype == 'varchar':
-                record_size += 2 + attr.size
-            else:
-                raise ValueError(f"Unsupported data type: {attr.dtype}")
-        return record_size
+        return self.max_record_size
 
     def get_unique_attr_count(self):
         """
@@ -290,41 +432,99 @@ class TableFileManager:
 
         :return: A JSON structured of key(table name) -> value(unique count).
         """
-        records = self.read_table()
-        attr_names = [attr[0] for attr in self.schema.get_metadata()]
-        attr_record = [[] for _ in range(len(attr_names))]
+        attr_names = self.attribute_names
+        attr_values = [set() for _ in range(len(attr_names))]
 
-        for rec in records:
-            for i in range(len(rec)):
-                attr_record[i].append(rec[i])
+        for columns in self.iter_columns():
+            for values, column in zip(attr_values, columns):
+                values.update(column)
 
-        attr_count = {}
+        return {name: len(values) for name, values in zip(attr_names, attr_values)}
 
-        for i in range(len(attr_names)):
-            attr_count[attr_names[i]] = len(
-                list(set(attr_record[i])))  # Counts the length of the unique attribute records
+    def get_buffer(self, file_path: str, block_num: int) -> Block:
+        return self.failure_recovery.buffer.get(file_path, block_num)
 
-        return attr_count
+    def set_buffer(self, file_path: str, block_num: int, block: Block):
+        self.failure_recovery.buffer.set(file_path, block_num, block)
 
-    def get_buffer(self, table_name: str, block_num: int) -> Block:
-        return self.failure_recovery.buffer.get(table_name, block_num)
+    def evict_buffer(self, file_path: str, block_num: int) -> None:
+        """
+        Drop a block from the buffer, using the buffer's own evict method when it has one.
+        Otherwise the block is replaced by None, which __get_block and __get_blocks read as a miss.
 
-    def set_buffer(self, table_name: str, block_num: int, block: Block):
-        self.failure_recovery.buffer.set(table_name, block_num, block)
+        :param file_path: The table file the block belongs to.
+        :param block_num: The block number to drop.
+        :return: None
+        """
+        evict = getattr(self.failure_recovery.buffer, "evict", None)
+        if evict is not None:
+            evict(file_path, block_num)
+        else:
+            self.set_buffer(file_path, block_num, None)
 
     # ===== Private Functions =====
 
+    def __compile_batch(self, condition: Condition) -> Callable[[ByteString, int, int], List[bool]] | None:
+        """
+        Compile a condition into a predicate over whole runs of records, when the table
+        stores fixed-size records.
+
+        :param condition: The condition to compile.
+        :return: The predicate from Condition.compile_batch, or None if it cannot be used.
+        """
+        if self.record_size is None:
+            return None
+        return condition.compile_batch(self.serializer.fixed_offsets(), self.record_size)
+
+    def __field_updates(self, updates_idx: List[Tuple[int, str, Callable]], parser: ExpressionParser) -> List[Tuple] | None:
+        """
+        Resolve the updated columns to fields that can be packed into a record in place.
+
+        :param updates_idx: (column position, new value expression, compiled expression) of every update.
+        :param parser: The parser used to recognize constant expressions.
+        :return: (offset, pack, cast, compiled expression, constant value or None) per update,
+                 or None if some updated column is not an int or float at a fixed offset.
+        """
+        fixed_offsets = self.serializer.fixed_offsets()
+        field_updates = []
+
+        for col_index, new_value, evaluate in updates_idx:
+            name, dtype, _ = self.metadata[col_index]
+            if name not in fixed_offsets or dtype not in FIELD_FORMATS:
+                return None
+
+            tokens = parser.tokenize(new_value)
+            constant = float(tokens[0]) if len(tokens) == 1 and parser.is_number(tokens[0]) else None
+            cast = int if dtype == 'int' else float
+            field_updates.append((fixed_offsets[name][0], FIELD_FORMATS[dtype].pack, cast, evaluate, constant))
+
+        return field_updates
+
+    def __bind_schema(self) -> None:
+        """
+        Build the serializer and the attribute lookups derived from the schema.
+
+        :return: None
+        """
+        self.metadata: List[Tuple[str, str, int]] = self.schema.get_metadata()
+        self.attribute_names: Tuple[str, ...] = tuple(name for name, _, _ in self.metadata)
+        self.name_to_index: Dict[str, int] = {name: i for i, name in enumerate(self.attribute_names)}
+
+        self.serializer: RecordSerializer = RecordSerializer(self.metadata)
+        self.record_size: int | None = self.serializer.fixed_size()
+
     def __write_header(self) -> None:
         """
         Write the table header to the binary file.
 
         :return: None
         """
+        self.close()
         self.init_file()
         header = bytearray()
 
         # Add magic number
-        header.extend(b"HEAD")
+        header.extend(HEADER_MAGIC)
 
         # Placeholder for header length (to be updated later)
         header.extend((0).to_bytes(4, byteorder='little'))
@@ -346,27 +546,30 @@ class TableFileManager:
         # Calculate and update header length
         header_length = len(header)
         header[4:8] = header_length.to_bytes(4, byteorder='little')
+        self.header_length = header_length
+        self.max_record_size = self.__compute_max_record_size()
 
         # Write header to the first block
         block = Block()
         block.add_record(header)
         block.write_block(self.file_path, 0)
-        self.set_buffer(self.table_name, 0, block)
+        self.set_buffer(self.file_path, 0, block)
 
-    def __read_header(self) -> None:
+    def __read_header(self) -> bytes:
         """
         Read and parse the table header from the binary file.
 
-        :return: None
+        :return: The magic number of the file, telling the record format apart.
         :raises ValueError: If the header is invalid.
         """
         block = self.__get_block(0)
+        block.init_cursor()
 
-        magic = block.read(4)
-        if magic != b"HEAD":
+        magic = bytes(block.read(4))
+        if magic not in (HEADER_MAGIC, LEGACY_HEADER_MAGIC):
             raise ValueError("Invalid table file: missing header.")
 
-        header_length = int.from_bytes(block.read(4), byteorder='little')
+        self.header_length = int.from_bytes(block.read(4), byteorder='little')
 
         self.record_count = int.from_bytes(block.read(4), byteorder='little')
         self.block_count = int.from_bytes(block.read(2), byteorder='little')
@@ -383,26 +586,256 @@ class TableFileManager:
         sentinel = block.read(1)
         if sentinel != b"\xCC":
             raise ValueError("Invalid table file: missing sentinel.")
-        
+
+        self.max_record_size = self.__compute_max_record_size()
+
+        return magic
+
+    def __migrate_legacy_file(self) -> None:
+        """
+        Rewrite a table file that stores 0xCC-terminated records into the
+        length-prefixed record format.
+
+        :return: None
+        :raises ValueError: If a record does not match the schema.
+        """
+        records = []
+        for current_block, block in enumerate(self.__get_blocks(0, self.block_count)):
+            offset = self.header_length if current_block == 0 else 0
+
+            while offset < block.header["free_space_offset"]:
+                end = self.__legacy_record_end(block.data, offset)
+                record_bytes = block.data[offset:end]
+                length_bytes = len(record_bytes).to_bytes(RECORD_LENGTH_SIZE, byteorder='little')
+                records.append(self.serializer.deserialize(length_bytes + record_bytes))
+                offset = end + 1
+
+        self.record_count = 0
+        self.block_count = 1
+        self.__write_header()
+        self.write_table(records)
+
+    def __legacy_record_end(self, data: ByteString, offset: int) -> int:
+        """
+        Find the end of a 0xCC-terminated record by walking its fields, since the
+        field bytes themselves may contain 0xCC.
+
+        :param data: The block data holding the record.
+        :param offset: The offset of the record in data.
+        :return: The offset of the sentinel closing the record.
+        :raises ValueError: If the record does not match the schema.
+        """
+        if data[offset:offset + 2] != b"RC":
+            raise ValueError("Invalid table file: invalid record header.")
+
+        end = offset + 2
+        try:
+            for _, dtype, size in self.metadata:
+                if dtype == "varchar":
+                    end += VARCHAR_LENGTH.size + VARCHAR_LENGTH.unpack_from(data, end)[0]
+                else:
+                    end += size
+            sentinel = data[end]
+        except (struct.error, IndexError):
+            raise ValueError("Invalid table file: record runs past the end of its block.")
+
+        if sentinel != 0xCC:
+            raise ValueError("Invalid table file: missing record sentinel.")
+        return end
+
+    def __compute_max_record_size(self) -> int:
+        """
+        Calculate the maximum size of a single record based on the schema.
+
+        :return: The maximum size of a record, in bytes.
+        :raises ValueError: If an unsupported data type is encountered.
+        """
+        record_size = 0
+        for attr in self.schema.attributes:
+            field_size = MAX_FIELD_SIZE.get(attr.dtype)
+            if field_size is None:
+                raise ValueError(f"Unsupported data type: {attr.dtype}")
+            record_size += field_size(attr.size)
+        return record_size
+
     def __get_block(self, block_number) -> Block :
-        block = self.get_buffer(self.table_name, block_number)
+        # None is a miss, including a block dropped by evict_buffer
+        block = self.get_buffer(self.file_path, block_number)
         if block is None:
-            block = Block.read_block(self.file_path, block_number)
-            self.set_buffer(self.table_name, block_number, block)
+            self.__advise("MADV_RANDOM", block_number, 1)
+            block = Block.read_blocks_from(self.__get_mapped_file(), block_number, 1)[0]
+            self.set_buffer(self.file_path, block_number, block)
         return block
 
+    def __get_mapped_file(self) -> mmap.mmap:
+        """
+        Get a read-only memory map of the table file, mapping it on first use.
+        The map is kept until the file is written to, so repeated scans reuse it.
+
+        :return: The memory-mapped table file.
+        """
+        if self.mapped_file is None:
+            with open(self.file_path, "rb") as fd:
+                self.mapped_file = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.mapped_file
+
+    def __release_mapped_file(self) -> None:
+        """
+        Drop the memory map of the table file, so the next read maps the file as it is now.
+
+        :return: None
+        """
+        if self.mapped_file is not None:
+            self.mapped_file.close()
+            self.mapped_file = None
+
+    def __get_write_file(self) -> BinaryIO:
+        """
+        Get the handle used to write the table file, opening it on first use.
+
+        :return: The table file, opened for reading and writing.
+        """
+        if self.write_file is None:
+            self.write_file = open(self.file_path, "r+b")
+        return self.write_file
+
+    def __advise(self, advice_name: str, start: int, count: int) -> None:
+        """
+        Tell the kernel how a run of blocks of the mapped file is about to be read.
+        Does nothing on platforms without madvise.
+
+        :param advice_name: The name of the mmap.MADV_* constant to apply.
+        :param start: The first block number of the run.
+        :param count: The number of blocks in the run.
+        :return: None
+        """
+        advice = getattr(mmap, advice_name, None)
+        if advice is None:
+            return
+
+        mapped_file = self.__get_mapped_file()
+        page_start = start * BLOCK_SIZE // mmap.PAGESIZE * mmap.PAGESIZE
+        end = min((start + count) * BLOCK_SIZE, len(mapped_file))
+        if end > page_start:
+            mapped_file.madvise(advice, page_start, end - page_start)
+
+    def __get_blocks(self, start: int, end: int) -> List[Block]:
+        """
+        Fetch blocks [start, end), taking buffered blocks from the buffer and
+        reading every run of unbuffered blocks from disk in one call.
+
+        :param start: The first block number to fetch.
+        :param end: The block number to stop before.
+        :return: The blocks, in block order.
+        """
+        blocks = [self.get_buffer(self.file_path, i) for i in range(start, end)]
+
+        i = 0
+        while i < len(blocks):
+            if blocks[i] is not None:
+                i += 1
+                continue
+
+            run_end = i
+            while run_end < len(blocks) and blocks[run_end] is None:
+                run_end += 1
+
+            if run_end - i > 1:
+                self.__advise("MADV_SEQUENTIAL", start + i, run_end - i)
+            for j, block in enumerate(Block.read_blocks_from(self.__get_mapped_file(), start + i, run_end - i), start=i):
+                blocks[j] = block
+                self.set_buffer(self.file_path, start + j, block)
+            i = run_end
+
+        return blocks
+
+    def __iter_blocks(self, start: int, end: int) -> Iterator[Tuple[int, Block]]:
+        """
+        Iterate over blocks [start, end), fetching them SCAN_BATCH_BLOCKS at a time
+        so a scan only holds a bounded number of blocks at once.
+
+        :param start: The first block number to fetch.
+        :param end: The block number to stop before.
+        :return: An iterator of (block number, block), in block order.
+        """
+        for batch_start in range(start, end, SCAN_BATCH_BLOCKS):
+            batch_end = min(batch_start + SCAN_BATCH_BLOCKS, end)
+            yield from enumerate(self.__get_blocks(batch_start, batch_end), start=batch_start)
+
+    def __record_spans(self, block_number: int, block: Block) -> List[Tuple[int, int]]:
+        """
+        Locate the records stored in a block.
+
+        :param block_number: The block number, used to skip the table header in block 0.
+        :param block: The block to scan.
+        :return: (start, end) offsets of every record in block.data, in storage order.
+        """
+        offset = self.header_length if block_number == 0 else 0
+        free_space_offset = block.header["free_space_offset"]
+
+        record_size = self.record_size
+        if record_size is not None:
+            return [(start, start + record_size) for start in range(offset, free_space_offset, record_size)]
+
+        spans = []
+        add_span = spans.append
+        unpack_length = RECORD_LENGTH.unpack_from
+        data = block.data
+
+        while offset < free_space_offset:
+            end = offset + RECORD_LENGTH_SIZE + unpack_length(data, offset)[0]
+            add_span((offset, end))
+            offset = end
+
+        return spans
+
     def __set_block(self, block_number, block: Block) -> None :
-        self.set_buffer(self.table_name, block_number, block)
-        block.write_block(self.file_path, block_number)
+        self.set_buffer(self.file_path, block_number, block)
+        block.dirty = True
+        self.dirty_blocks[block_number] = block
+
+    def __set_blocks(self, start: int, blocks: List[Block]) -> None:
+        """
+        Buffer a run of consecutive blocks and mark them dirty.
+
+        :param start: The block number of the first block.
+        :param blocks: The blocks to store, in block order.
+        """
+        for block_number, block in enumerate(blocks, start=start):
+            self.__set_block(block_number, block)
+
+    def __truncate(self, block_count: int) -> None:
+        """
+        Drop the blocks past the first block_count blocks from the table file and the buffer.
+
+        :param block_count: The number of blocks to keep.
+        :return: None
+        """
+        if block_count < self.block_count:
+            self.__release_mapped_file()
+            os.truncate(self.file_path, block_count * BLOCK_SIZE)
+            for block_number in range(block_count, self.block_count):
+                self.evict_buffer(self.file_path, block_number)
+                self.dirty_blocks.pop(block_number, None)
+        self.block_count = block_count
 
     def __update_header(self) -> None:
         """
-        Update the metadata in the table header.
+        Update the metadata in the table header held by block 0.
+        The header is written to disk by the next flush.
 
         :return: None
         """
-        block = self.__get_block(0)
+        block = self.dirty_blocks.get(0) or self.__get_block(0)
+        self.__patch_header(block)
+        self.header_dirty = True
+
+    def __patch_header(self, block: Block) -> None:
+        """
+        Store the current record and block counts in the header held by block 0.
+
+        :param block: Block 0 of the table.
+        :return: None
+        """
         block.data[8:12] = self.record_count.to_bytes(4, "little")
         block.data[12:14] = self.block_count.to_bytes(2, "little")
-        block.write_block(self.file_path, 0)
-        self.__set_block(0, block)
@@ -1,19 +1,144 @@
 #!/usr/bin/python3
 
 import re
+import sys
+from functools import lru_cache
+from itertools import chain
+from operator import itemgetter
+from typing import Iterable
 from StorageManager import StorageManager
 from lib.Schema import Schema
 from lib.Attribute import Attribute
 from lib.Condition import Condition
 
+# Statement patterns, compiled once for every statement the driver parses
+_CREATE_RE = re.compile(r"CREATE TABLE\s+(\w+)\s*\((.*)\)", re.DOTALL | re.IGNORECASE)
+_ATTR_RE = re.compile(r"(\w+)\s+(\w+)(?:\((\d+)\))?")
+_SELECT_RE = re.compile(
+    r"SELECT\s+(?P<cols>.*?)\s+FROM\s+(?P<table>\w+)"
+    r"(?P<joins>(?:\s+JOIN\s+\w+\s+ON\s+\w+\.\w+\s*=\s*\w+\.\w+)*)"
+    r"(?:\s+WHERE\s+(?P<where>.*))?",
+    re.IGNORECASE
+)
+_JOIN_RE = re.compile(r"JOIN\s+(\w+)\s+ON\s+(\w+\.\w+)\s*=\s*(\w+\.\w+)", re.IGNORECASE)
+_INSERT_RE = re.compile(r"INSERT INTO\s+(\w+)\s+VALUES\s*(\(.*\))", re.DOTALL | re.IGNORECASE)
+_VAL_ROW_RE = re.compile(r"""\(((?:'[^']*'|"[^"]*"|[^'")])*)\)""")
+_VALUE_RE = re.compile(r"""(?:^|,)\s*('[^']*'|"[^"]*"|[^,]*)""")
+_INT_RE = re.compile(r"[-+]?\d+")
+_SCHEMA_RE = re.compile(r"SCHEMA (\w+)", re.IGNORECASE)
+_UPDATE_RE = re.compile(r"UPDATE\s+(\w+)\s+SET\s+(.+?)(?:\s+WHERE\s+(.+))?$", re.IGNORECASE)
+_SET_SPLIT_RE = re.compile(r"""(?:'[^']*'|"[^"]*"|[^,'"])+""")
+_SET_RE = re.compile(r"\s*(\w+)\s*=\s*(.*?)\s*", re.DOTALL)
+_DELETE_RE = re.compile(r"DELETE FROM\s+(\w+)\s+WHERE\s+(.+)", re.IGNORECASE)
+_DROP_RE = re.compile(r"DROP TABLE\s+(\w+)", re.IGNORECASE)
+_WHERE_OP_RE = re.compile(r"\s*(<=|>=|!=|==|=|<|>)\s*")
+
+# Number of parsed SELECT, SCHEMA, UPDATE and DELETE statements kept for repeated statements
+PARSE_CACHE_SIZE = 256
+
+
+def _parse_condition(where_clause: str) -> Condition:
+    """Split a WHERE clause around its first comparison operator into a Condition."""
+    match = _WHERE_OP_RE.search(where_clause)
+    if not match:
+        raise ValueError(f"Invalid condition '{where_clause}'")
+    return Condition(where_clause[:match.start()].strip(), match.group(1), where_clause[match.end():].strip())
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_select(statement: str) -> tuple:
+    """
+    Parse a SELECT statement into (selected columns or None for *, table names,
+    join attribute pairs, WHERE condition or None).
+    """
+    # SELECT * FROM table_name, split without the regex
+    words = statement.split()
+    if len(words) == 4 and words[1] == "*" and words[0].upper() == "SELECT" and words[2].upper() == "FROM" \
+            and words[3].isidentifier():
+        return None, (words[3],), (), None
+
+    match = _SELECT_RE.match(statement)
+    if not match:
+        raise ValueError("Error: Invalid SELECT statement.")
+
+    column_selected = match.group("cols").strip()
+    column_names = None if column_selected == "*" else tuple(col.strip() for col in column_selected.split(","))
+
+    tables = [match.group("table")]
+    join_attributes = []
+    for join in _JOIN_RE.finditer(match.group("joins")):
+        tables.append(join.group(1))
+        join_attributes.append((join.group(2), join.group(3)))
+
+    where_clause = match.group("where")
+    condition = _parse_condition(where_clause) if where_clause else None
+    return column_names, tuple(tables), tuple(join_attributes), condition
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_schema(statement: str) -> str:
+    """Parse a SCHEMA statement into its table name."""
+    if statement[:7].upper() == "SCHEMA " and statement[7:].isidentifier():
+        return statement[7:]
+
+    match = _SCHEMA_RE.search(statement)
+    if not match:
+        raise ValueError("Error: Invalid SCHEMA statement.")
+    return match.group(1)
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_update(statement: str) -> tuple:
+    """Parse an UPDATE statement into (table name, (column, value) assignments, WHERE condition or None)."""
+    match = _UPDATE_RE.search(statement)
+    if not match:
+        raise ValueError("Error: Invalid UPDATE statement.")
+
+    # Split the assignments on the commas outside quoted strings, rejecting anything left over
+    set_clause = match.group(2)
+    pieces = _SET_SPLIT_RE.findall(set_clause)
+    if ",".join(pieces) != set_clause:
+        raise ValueError(f"Error: Invalid assignment '{set_clause.strip()}'")
+
+    assignments = []
+    for piece in pieces:
+        assignment = _SET_RE.fullmatch(piece)
+        if not assignment or not assignment.group(2):
+            raise ValueError(f"Error: Invalid assignment '{set_clause.strip()}'")
+        assignments.append(assignment.groups())
+
+    where_clause = match.group(3)
+    condition = _parse_condition(where_clause) if where_clause else None
+    return match.group(1), tuple(assignments), condition
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_delete(statement: str) -> tuple:
+    """Parse a DELETE statement into (table name, WHERE condition)."""
+    match = _DELETE_RE.search(statement)
+    if not match:
+        raise ValueError("Error: Invalid DELETE statement.")
+    return match.group(1), _parse_condition(match.group(2))
+
 
 class TestDriver:
     def __init__(self, base_path: str) -> None:
         self.base_path = base_path
         self.storage_manager = StorageManager(base_path)
 
+        # (statement prefix, parser) of each statement, by the lowercased first word of the statement
+        self.handlers = {
+            "create": ("create table", self.parse_create_table),
+            "select": ("select", self.parse_select),
+            "insert": ("insert into", self.parse_insert),
+            "schema": ("schema", self.parse_schema),
+            "update": ("update", self.parse_update),
+            "delete": ("delete from", self.parse_delete),
+            "drop": ("drop table", self.parse_drop),
+        }
+
     def parse_create_table(self, statement: str):
-        schema_match = re.search(r"CREATE TABLE\s+(\w+)\s*\((.*)\)", statement, re.DOTALL | re.IGNORECASE)
+        schema_match = _CREATE_RE.search(statement)
         
         if not schema_match:
             print("Error: Invalid CREATE TABLE statement.")
@@ -25,7 +150,7 @@ class TestDriver:
         attributes = []
         for attribute_str in schema_str.split(','):
             attribute_str = attribute_str.strip()
-            match = re.match(r"(\w+)\s+(\w+)(?:\((\d+)\))?", attribute_str)
+            match = _ATTR_RE.match(attribute_str)
             if match:
                 name = match.group(1)
                 dtype = match.group(2).lower()
@@ -41,68 +166,40 @@ class TestDriver:
         except ValueError as e :
             print(e)
 
-    def parse_select_no_join(self, statement: str) -> None:
-        """Parse SELECT * FROM table_name statement and print the result."""
-        match = re.search(r"SELECT\s+(.*?)\s+FROM\s+(\w+)(?:\s+WHERE\s+(.*))?", statement, re.IGNORECASE)
-        if not match:
-            print("Error: Invalid SELECT statement.")
+    def _select_table(self, column_names: tuple | None, table_name: str, condition: Condition | None) -> None:
+        """Print the result of a SELECT statement without JOIN, given its parsed parts."""
+        batches = self.storage_manager.iter_table_data(table_name, condition)
+        first_batch = next(batches, None)
+
+        if first_batch is None:
+            print("No Record found")
             return
 
-        column_selected = match.group(1)
-        table_name = match.group(2)
-        try:
-            where_clause = match.group(3)
-        except:
-            where_clause = None 
+        all_columns, column_index = self._get_columns(table_name)
+        
+        if column_names is None:
+            self._render_table(all_columns, chain([first_batch], batches))
+            return
 
-        try:
-            if where_clause:
-                comparison_operators = ['<=', '>=', '!=', '==', '=', '<', '>']
-                
-                for op in comparison_operators:
-                    if op in where_clause:
-                        parts = where_clause.split(op)
-                        
-                        operand1 = parts[0].strip()
-                        operand2 = parts[1].strip()
-
-                        condition = Condition(operand1, op, operand2)
-                        
-                        table_data = self.storage_manager.get_table_data(table_name, condition)
-                        break
-            else: 
-                table_data = self.storage_manager.get_table_data(table_name)
-
-            if (len(table_data) == 0) :
-                print("No Record found")
-                return
+        if not all(col in column_index for col in column_names):
+            print(f"Error: Some specified columns do not exist in table '{table_name}'.")
+            return
+        col_indices = [column_index[col] for col in column_names]
+        if len(col_indices) > 1:
+            project = itemgetter(*col_indices)
+        else:
+            project = lambda row, i=col_indices[0]: (row[i],)
 
-            schema = self.storage_manager.get_table_schema(table_name)
-            all_columns = [attr[0] for attr in schema.get_metadata()]
-            
-            if column_selected.strip() == "*":
-                column_names = all_columns
-            else:
-                column_names = [col.strip() for col in column_selected.split(",")]
-                if not set(column_names).issubset(all_columns):
-                    print(f"Error: Some specified columns do not exist in table '{table_name}'.")
-                    return
-
-            column_widths = [len(name) for name in column_names]
-            for row in table_data:
-                column_widths = [max(width, len(str(value))) for width, value in zip(column_widths, row)]
-
-            row_format = " | ".join(f"{{:<{width}}}" for width in column_widths)
-            separator = "-+-".join("-" * width for width in column_widths)
-
-            print(row_format.format(*column_names))
-            print(separator)
-            for row in table_data:
-                print(row_format.format(*row))
-            
-            # print(self.storage_manager.get_stats()) # testing purposes
-        except ValueError as e:
-            print(e)
+        self._render_table(column_names, (
+            list(map(project, batch)) for batch in chain([first_batch], batches)
+        ))
+        
+        # print(self.storage_manager.get_stats()) # testing purposes
+
+    def _get_columns(self, table_name: str) -> tuple[tuple[str, ...], dict[str, int]]:
+        """Get the column names of a table and their positions, as cached by its TableFileManager."""
+        table_file_manager = self.storage_manager.tables[table_name]
+        return table_file_manager.attribute_names, table_file_manager.name_to_index
 
     def parse_select(self, statement: str) -> None:
         """
@@ -113,57 +210,17 @@ class TestDriver:
         Format: 
         SELECT columns FROM table1 [JOIN table2 ON table1.attr = table2.attr]+ [WHERE condition]
         """
-        select_match = re.match(
-            r"SELECT\s+(.*?)\s+FROM\s+(\w+)(?:\s+JOIN\s+(\w+)\s+ON\s+(\w+\.\w+)\s*=\s*(\w+\.\w+))*(?:\s+WHERE\s+(.*))?", 
-            statement, 
-            re.IGNORECASE
-        )
-
-        if ("join" not in statement.lower()) :
-            self.parse_select_no_join(statement)
-            return
-        
-        if not select_match:
-            print("Error: Invalid SELECT statement.")
-            return
-
-        column_selected = select_match.group(1)
-
-        if column_selected.strip() == "*":
-            column_names = None
-        else:
-            column_names = [col.strip() for col in column_selected.split(",")]
-
-        tables = [select_match.group(2)]
-        join_attributes = []
-        where_clause = select_match.group(6)
-
-        join_pattern = re.compile(r"JOIN\s+(\w+)\s+ON\s+(\w+\.\w+)\s*=\s*(\w+\.\w+)")
-        joins = join_pattern.findall(statement)
-
-        for join in joins:
-            tables.append(join[0])
-            join_attributes.append((join[1], join[2]))
-
         try:
-            table_conditions = [None] * len(tables)
-            global_condition = None
-
-            if where_clause:
-                comparison_operators = ['<=', '>=', '!=', '==', '=', '<', '>']
-                
-                for op in comparison_operators:
-                    if op in where_clause:
-                        parts = where_clause.split(op)
-                        operand1 = parts[0].strip()
-                        operand2 = parts[1].strip()
-                        global_condition = Condition(operand1, op, operand2)
-                        break
+            column_names, tables, join_attributes, global_condition = _parse_select(statement)
+
+            if len(tables) == 1:
+                self._select_table(column_names, tables[0], global_condition)
+                return
 
             table_data, column_names = self.storage_manager.get_joined_table(
-                table_names=tables, 
-                join_attributes=join_attributes, 
-                table_conditions=table_conditions, 
+                table_names=list(tables), 
+                join_attributes=list(join_attributes), 
+                table_conditions=[None] * len(tables), 
                 global_condition=global_condition
             )
 
@@ -171,24 +228,14 @@ class TestDriver:
                 print("No Record found")
                 return
 
-            column_widths = [len(name) for name in column_names]
-            for row in table_data:
-                column_widths = [max(width, len(str(value))) for width, value in zip(column_widths, row)]
-
-            row_format = " | ".join(f"{{:<{width}}}" for width in column_widths)
-            separator = "-+-".join("-" * width for width in column_widths)
-
-            print(row_format.format(*column_names))
-            print(separator)
-            for row in table_data:
-                print(row_format.format(*row))
+            self._render_table(column_names, [table_data])
             
         except ValueError as e:
             print(e)
 
     def parse_insert(self, statement: str) -> None:
         """Parse INSERT INTO table_name VALUES (...) statement and insert data."""
-        table_name_match = re.search(r"INSERT INTO (\w+) VALUES \((.*?)\)", statement, re.DOTALL | re.IGNORECASE)
+        table_name_match = _INSERT_RE.search(statement)
         if not table_name_match:
             print("Error: Invalid INSERT statement.")
             return
@@ -196,23 +243,18 @@ class TestDriver:
         table_name = table_name_match.group(1)
         values_str = table_name_match.group(2)
         
-        values_list = []
-        for row_str in values_str.split('),'):
-            row_values = row_str.strip().strip('()').split(',')
-            values_list.append([v.strip() for v in row_values])
+        rows = (
+            self._parse_row([value.group(1).rstrip() for value in _VALUE_RE.finditer(row.group(1).strip())])
+            for row in _VAL_ROW_RE.finditer(values_str)
+        )
 
-        self.storage_manager.insert_into_table(table_name, values_list)
+        self.storage_manager.insert_into_table(table_name, rows)
         print(f"Data inserted into '{table_name}' successfully.")
 
     def parse_schema(self, statement: str) -> None:
         """Parse SCHEMA table_name statement and display the schema."""
-        table_name_match = re.search(r"SCHEMA (\w+)", statement, re.IGNORECASE)
-        if not table_name_match:
-            print("Error: Invalid SCHEMA statement.")
-            return
-
-        table_name = table_name_match.group(1)
         try:
+            table_name = _parse_schema(statement)
             schema = self.storage_manager.get_table_schema(table_name)
             metadata = schema.get_metadata()
 
@@ -220,116 +262,69 @@ class TestDriver:
                 print(f"No schema found for table '{table_name}'.")
                 return
 
-            headers = ["Name", "Type", "Size"]
-            column_widths = [len(header) for header in headers]
-
-            for attr in metadata:
-                column_widths = [max(width, len(str(value))) for width, value in zip(column_widths, attr)]
-
-            row_format = " | ".join(f"{{:<{width}}}" for width in column_widths)
-            separator = "-+-".join("-" * width for width in column_widths)
-
-            print(row_format.format(*headers))
-            print(separator)
-            for attr in metadata:
-                print(row_format.format(*attr))
+            self._render_table(["Name", "Type", "Size"], [metadata])
 
         except ValueError as e:
             print(e)
 
     def parse_update(self, statement: str) -> None:
         """Parse UPDATE table_name SET column1=value1, column2=value2 WHERE condition statement."""
-        update_match = re.search(r"UPDATE\s+(\w+)\s+SET\s+(.+?)(?:\s+WHERE\s+(.+))?$", statement, re.IGNORECASE)
-
-        table_name = update_match.group(1)
-        set_clause = update_match.group(2)
-        where_clause = update_match.group(3)
-
-        update_values = {}
-        for assignment in set_clause.split(','):
-            assignment = assignment.strip()
-            col_match = re.match(r"(\w+)\s*=\s*(.+)", assignment)
-            if not col_match:
-                print(f"Error: Invalid assignment '{assignment}'")
-                return
-            
-            column = col_match.group(1)
-            value = col_match.group(2).strip()
-            update_values[column] = value
-
         try:
-            if where_clause:
-                comparison_operators = ['<=', '>=', '!=', '==', '=', '<', '>']
-                
-                for op in comparison_operators:
-                    if op in where_clause:
-                        parts = where_clause.split(op)
-                        
-                        operand1 = parts[0].strip()
-                        operand2 = parts[1].strip()
-
-                        condition = Condition(operand1, op, operand2)
-                        
-                        rows_affected = self.storage_manager.update_table(table_name, update_values, condition)
-                        break
-            else: 
-                rows_affected = self.storage_manager.update_table(table_name, update_values)
+            table_name, assignments, condition = _parse_update(statement)
+            rows_affected = self.storage_manager.update_table(table_name, dict(assignments), condition)
             print(f"{rows_affected} row(s) updated in '{table_name}'.")
         except ValueError as e :
             print(e)
 
+    def _render_table(self, headers: list[str], batches: Iterable[list]) -> None:
+        """Helper method to print batches of rows under their headers as an aligned table."""
+        column_widths = [len(header) for header in headers]
+        rendered = []
+        for batch in batches:
+            columns = [list(map(str, column)) for column in zip(*batch)]
+            if columns:
+                column_widths = [max(width, max(map(len, column))) for width, column in zip(column_widths, columns)]
+                rendered.extend(zip(*columns))
+
+        join_cells = " | ".join
+        ljust = str.ljust
+        lines = [
+            join_cells(map(ljust, headers, column_widths)),
+            "-+-".join("-" * width for width in column_widths),
+        ]
+        lines.extend(join_cells(map(ljust, row, column_widths)) for row in rendered)
+        lines.append("")
+        sys.stdout.write("\n".join(lines))
+
     def _parse_value(self, value: str):
         """Helper method to parse and convert values."""
-        if (value.startswith("'") and value.endswith("'")) or \
-        (value.startswith('"') and value.endswith('"')):
-            return value.strip("'\"")
-        
-        if value.isdigit():
+        if len(value) >= 2 and value[0] in ("'", '"') and value[-1] == value[0]:
+            return value[1:-1]
+
+        if _INT_RE.fullmatch(value):
             return int(value)
-        
+
         try:
             return float(value)
         except ValueError:
             return value
+
+    def _parse_row(self, values: list[str]) -> list:
+        """Helper method to parse and convert every value of a row."""
+        return list(map(self._parse_value, values))
         
     def parse_delete(self, statement: str) -> None:
         """Parse DELETE FROM table_name WHERE condition statement."""
-        delete_match = re.search(r"DELETE FROM\s+(\w+)\s+WHERE\s+(.+)", statement, re.IGNORECASE)
-        
-        if not delete_match:
-            print("Error: Invalid DELETE statement.")
-            return
-
-        table_name = delete_match.group(1)
         try:
-            where_clause = delete_match.group(2)
-        except:
-            where_clause = None 
-
-        try:
-            if where_clause:
-                comparison_operators = ['<=', '>=', '!=', '==', '=', '<', '>']
-                
-                for op in comparison_operators:
-                    if op in where_clause:
-                        parts = where_clause.split(op)
-                        
-                        operand1 = parts[0].strip()
-                        operand2 = parts[1].strip()
-
-                        condition = Condition(operand1, op, operand2)
-                        
-                        rows_affected = self.storage_manager.delete_table_record(table_name, condition)
-                        break
-            else: 
-                rows_affected = self.storage_manager.delete_table_record(table_name)
+            table_name, condition = _parse_delete(statement)
+            rows_affected = self.storage_manager.delete_table_record(table_name, condition)
             print(f"{rows_affected} row(s) deleted from '{table_name}'.")
         except ValueError as e:
             print(e)
 
     def parse_drop(self, statement: str) -> None:
         """Parse DROP TABLE table_name statement and delete the table."""
-        drop_match = re.search(r"DROP TABLE\s+(\w+)", statement, re.IGNORECASE)
+        drop_match = _DROP_RE.search(statement)
 
         if not drop_match:
             print("Error: Invalid DROP TABLE statement.")
@@ -344,40 +339,29 @@ class TestDriver:
             print(e)
 
     def run(self) -> None:
-        """Run the CLI driver."""
-        while True:
-            statement = input("KWL> ").strip()
+        """Run the CLI driver. Statements piped in from a script are read without prompting."""
+        if sys.stdin.isatty():
+            lines = iter(lambda: input("KWL> "), None)
+        else:
+            lines = sys.stdin
 
-            if statement.lower() == "exit":
+        for line in lines:
+            statement = line.strip()
+            command = statement.split(None, 1)[0].lower() if statement else ""
+
+            if command == "exit" and statement.lower() == "exit":
                 print("Exiting KWL driver...")
                 break
 
-            elif statement.lower().startswith("create table"):
-                self.parse_create_table(statement)
-
-            elif statement.lower().startswith("select"):
-                self.parse_select(statement)
-
-            elif statement.lower().startswith("insert into"):
-                self.parse_insert(statement)
-
-            elif statement.lower().startswith("schema"):
-                self.parse_schema(statement)
-
-            elif statement.lower().startswith("update"):
-                self.parse_update(statement)
-
-            elif statement.lower().startswith("delete from"):
-                self.parse_delete(statement)
-            
-            elif statement.lower().startswith("drop table"):
-                self.parse_drop(statement)
-
-            else:
+            prefix, handler = self.handlers.get(command, ("", None))
+            if handler is None or statement[:len(prefix)].lower() != prefix:
                 print("Error: Unsupported KWL statement.")
+            else:
+                handler(statement)
 
 
 if __name__ == "__main__":
     base_path = "storage"
     KWL_driver = TestDriver(base_path)
-    KWL_driver.run()
\ No newline at end of file
+    with KWL_driver.storage_manager:
+        KWL_driver.run()
\ No newline at end of file